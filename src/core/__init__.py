@@ -1,18 +1,27 @@
-from .check import monitor_all, Diff
+from .check import monitor_all, CheckStats
+from .diffset import Diff, DiffSet
+from .clusters import Cluster
 from .area import area_manager
 from .logging import init_logger, logger, add_status_bar_handler_to_logger
 from .settings import settings, init_settings
 from .fs import app_path
+from .engine import check_engine
+from .tiles import tile_cache
 
 __all__ = [
     'load_areas_config',
     'monitor_all',
     'Diff',
+    'DiffSet',
+    'Cluster',
+    'CheckStats',
     'area_manager',
     'init_logger',
     'add_status_bar_handler_to_logger',
     'logger',
     'init_settings',
     'settings',
-    'app_path'
+    'app_path',
+    'check_engine',
+    'tile_cache',
 ]
\ No newline at end of file
@@ -1,37 +1,95 @@
-import tomllib
-import tomli_w
+import datetime
 import os
-import io
 import httpx
 import shutil
-import asyncio
+import threading
+from types import MappingProxyType
+import numpy as np
 from PIL import Image
 from src.core.fs import app_path
 from src.core.logging import logger
+from src.core.engine import check_engine
+from src.core.tiles import Tile, get_tile
+from src.core.mask_index import rebuild_mask_index
+from src.core.mask_file import write_mask
+from src.core.references import reference_cache
+from src.core.reference_store import reference_store
+from src.core.results import result_memo
+from src.core.persist import WriteBehind
+from src.core.area_store import PendingChanges, open_area_store
+from src.core.settings import settings
 
-async def fetch_current_image(area: dict):
+async def fetch_current_image(area: dict, client: httpx.AsyncClient) -> Tile:
     x = area["position"]["x"]
     y = area["position"]["y"]
 
-    url = f"https://backend.wplace.live/files/s0/tiles/{x}/{y}.png"
     logger().info(f'正在从 wplace.live 获取 `{area["name"]}` 所在区块...')
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        response.raise_for_status()
-        image = Image.open(io.BytesIO(response.content)).convert("RGBA")
-    return image
+    return await get_tile(client, x, y)
+
+
+async def _fetch_with_shared_client(area: dict):
+    return await fetch_current_image(area, check_engine().client())
+
+
+def _freeze(area: dict) -> MappingProxyType:
+    frozen = dict(area)
+    frozen['position'] = MappingProxyType(dict(area['position']))
+    return MappingProxyType(frozen)
 
 
 class AreaManager:
+    """
+    按名字索引的区域列表（保持添加顺序）。
+    检查使用 snapshot() 返回的只读副本，检查时间通过 mark_checked 写回，
+    检查线程不会直接修改界面正在读取的区域。
+    区域保存在 application.area_store 指定的位置（areas.toml 或 areas.db）。
+    """
     def __init__(self):
-        with open(app_path().get("data/areas.toml"), "rb") as f:
-            config = tomllib.load(f)
-        self._areas = config["areas"]
+        cfg = settings().application
+        self._store = open_area_store(cfg.area_store, cfg.check_history_days)
+        self._lock = threading.RLock()
+        self._areas: dict[str, dict] = {area['name']: area for area in self._store.load()}
+        self._snapshot: tuple[MappingProxyType, ...] | None = None
+        self._pending = PendingChanges()
+        self._persister = WriteBehind("区域配置", self._write, lambda: settings().application.save_debounce_ms)
 
     @property
     def areas(self) -> list[dict]:
-        return self._areas
-    
+        with self._lock:
+            return list(self._areas.values())
+
+    def _changed(self, name: str | None = None):
+        self._snapshot = None
+        if name is not None:
+            self._pending.updated.add(name)
+
+    def snapshot(self, names: list[str] | None = None) -> tuple[MappingProxyType, ...]:
+        """区域的只读副本；没有修改时多次调用返回同一个对象"""
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = tuple(_freeze(area) for area in self._areas.values())
+            if names is None:
+                return self._snapshot
+            return tuple(area for area in self._snapshot if area['name'] in names)
+
+    def mark_checked(self, name: str, date: datetime.datetime, diffs: int = 0, new_diffs: int = 0):
+        with self._lock:
+            area = self._areas.get(name)
+            if area is not None:
+                area['last_check_date'] = date
+                self._pending.checks.append((name, date, diffs, new_diffs))
+                self._changed(name)
+
+    def summary(self, name: str) -> dict | None:
+        """最近一次检查的异常像素数和检查次数，只有 SQLite 存储会记录"""
+        self.flush()
+        return self._store.summary(name)
+
+    def history(self, name: str, limit: int = 50) -> list[dict]:
+        """最近的检查记录，只有 SQLite 存储会记录"""
+        self.flush()
+        return self._store.history(name, limit)
+
     def add_area(self, name, x, y) -> dict:
         logger().info('新区域：正在创建中...')
         new_area = {
@@ -41,8 +99,8 @@ class AreaManager:
         }
         logger().info('新区域：正在获取当前状态作为参考图...')
         try:
-            img = asyncio.run(fetch_current_image(new_area))
-            self.update_original(name, img)
+            tile = check_engine().run(_fetch_with_shared_client(new_area))
+            self.update_original(name, tile.image)
 
         except Exception as e:
             logger().error(f'无法加载参考图: {e}')
@@ -51,66 +109,141 @@ class AreaManager:
         logger().info('新区域：正在复制遮罩模板...')
         self.update_mask(name, app_path().get('assets/mask_template.png'))
 
-        self.areas.append(new_area)
+        with self._lock:
+            self._areas[name] = new_area
+            self._changed(name)
         self.save()
         logger().info('已添加新区域')
         return new_area
     
     def has(self, name: str) -> bool:
-        return any([a['name'] == name for a in self._areas])
+        return name in self._areas
     
     def area(self, name: str) -> dict:
-        return [area for area in self._areas if area['name'] == name][0]
+        return self._areas[name]
     
     def remove(self, name: str):
-        self._areas = [a for a in self._areas if a['name'] != name]
+        with self._lock:
+            self._areas.pop(name, None)
+            self._pending.ops.append(("remove", name))
+            self._pending.updated.discard(name)
+            self._pending.checks = [check for check in self._pending.checks if check[0] != name]
+            self._changed()
         self.save()
-        try:
-            os.remove(app_path().get_mask_image(name))
-            os.remove(app_path().get_original_image(name))
-        except Exception:
-            pass
+        reference_cache().invalidate(name)
+        if reference_store() is not None:
+            reference_store().remove(name)
+        for path in (
+            app_path().get_mask(name),
+            app_path().get_mask_image(name),
+            app_path().get_original_image(name),
+            app_path().get_mask_index(name),
+        ):
+            try:
+                os.remove(path)
+            except Exception:
+                pass
+        result_memo().forget(name)
     
     def rename_area(self, area: dict, new_name: str):
         old_name = area['name']
-        area['name'] = new_name
+        with self._lock:
+            area['name'] = new_name
+            # 保持原来的顺序
+            self._areas = {(new_name if name == old_name else name): a for name, a in self._areas.items()}
+            self._pending.ops.append(("rename", old_name, new_name))
+            if old_name in self._pending.updated:
+                self._pending.updated.discard(old_name)
+                self._pending.updated.add(new_name)
+            self._pending.checks = [
+                (new_name, *check[1:]) if check[0] == old_name else check for check in self._pending.checks
+            ]
+            self._changed()
+        reference_cache().invalidate(old_name)
+        reference_cache().invalidate(new_name)
+        result_memo().forget(old_name)
+        result_memo().forget(new_name)
         
         try:
-            if os.path.exists(app_path().get_mask_image(old_name)):
-                os.rename(app_path().get_mask_image(old_name), app_path().get_mask_image(new_name))
-            if os.path.exists(app_path().get_original_image(old_name)):
-                os.rename(app_path().get_original_image(old_name), app_path().get_original_image(new_name))
+            if reference_store() is not None:
+                reference_store().rename(old_name, new_name)
+            for get_path in (
+                app_path().get_mask,
+                app_path().get_mask_image,
+                app_path().get_original_image,
+                app_path().get_mask_index,
+            ):
+                if os.path.exists(get_path(old_name)):
+                    os.rename(get_path(old_name), get_path(new_name))
         except Exception as e:
             print(f"failed to rename data file: {e}")
 
     def set_position(self, area: dict, x: int, y: int):
-        area['position'] = {'x': x, 'y': y }
+        with self._lock:
+            area['position'] = {'x': x, 'y': y }
+            self._changed(area['name'])
 
     def set_ignored(self, area: dict, ignored: bool):
-        area['ignored'] = ignored
+        with self._lock:
+            area['ignored'] = ignored
+            self._changed(area['name'])
 
     def save(self):
-        with open(app_path().get("data/areas.toml"), "wb") as f:
-            f.write(tomli_w.dumps({"areas": self._areas}).encode("utf-8"))
+        """在 application.save_debounce_ms 之后写入，期间的修改合并为一次写入"""
+        self._persister.schedule()
+
+    def flush(self):
+        """立即写入尚未保存的修改"""
+        self._persister.flush()
+
+    def _write(self):
+        with self._lock:
+            areas = [dict(area) for area in self._areas.values()]
+            changes, self._pending = self._pending, PendingChanges()
+        try:
+            self._store.write(areas, changes)
+        except Exception:
+            # 写入失败时保留这些修改，下次写入时一起提交
+            with self._lock:
+                changes.merge(self._pending)
+                self._pending = changes
+            raise
 
     def update_mask(self, area_name: str, mask: str | Image.Image):
+        """mask 为 PNG 文件路径或图片，非黑色的像素属于遮罩"""
         if mask is not None:
-            if type(mask) == str:
-                try:
-                    shutil.copy(mask, app_path().get_mask_image(area_name))
-                except Exception as e:
-                    logger().error(f"无法复制遮罩文件: {e}")
-            else:
-                mask: Image.Image = mask
-                try:
-                    mask.save(app_path().get_mask_image(area_name))
-                except Exception as e:
-                    logger().error(f"无法保存遮罩文件: {e}")  
+            reference_cache().invalidate(area_name)
+            try:
+                if type(mask) == str:
+                    mask = Image.open(mask)
+                write_mask(app_path().get_mask(area_name), np.asarray(mask.convert("L")))
+                if os.path.exists(app_path().get_mask_image(area_name)):
+                    os.remove(app_path().get_mask_image(area_name))
+            except Exception as e:
+                logger().error(f"无法保存遮罩文件: {e}")
+
+            try:
+                rebuild_mask_index(area_name)
+            except Exception as e:
+                logger().warning(f"无法生成遮罩索引: {e}")
 
 
     def update_original(self, area_name: str, original: str | Image.Image):
         if original is not None:
-            if type(original) == str:
+            reference_cache().invalidate(area_name)
+            store = reference_store()
+            if store is not None:
+                # 只改写参考图文件中该区域的槽位
+                try:
+                    if type(original) == str:
+                        original = Image.open(original)
+                    store.put(area_name, np.asarray(original.convert("RGBA")))
+                    # 导入时保留的 PNG 备份已经过时，删除以免被当作最新的参考图
+                    if os.path.exists(app_path().get_original_image(area_name)):
+                        os.remove(app_path().get_original_image(area_name))
+                except Exception as e:
+                    logger().error(f"无法保存参考图: {e}")
+            elif type(original) == str:
                 try:
                     shutil.copy(original, app_path().get_original_image(area_name))
                 except Exception as e:
@@ -123,7 +256,11 @@ class AreaManager:
                     logger().error(f"无法保存参考图文件: {e}")  
 
 
-_area_manager = AreaManager()
+_area_manager: AreaManager | None = None
 
 def area_manager() -> AreaManager:
+    # 第一次使用时才加载：需要先完成迁移并加载设置
+    global _area_manager
+    if _area_manager is None:
+        _area_manager = AreaManager()
     return _area_manager
\ No newline at end of file
@@ -0,0 +1,167 @@
+import datetime
+import os
+import sqlite3
+import tomllib
+import tomli_w
+from contextlib import closing
+from dataclasses import dataclass, field
+from src.core.fs import app_path
+from src.core.persist import atomic_write
+
+
+@dataclass
+class PendingChanges:
+    """两次写入之间对区域列表的修改，按发生顺序记录"""
+    # ("rename", 旧名字, 新名字) 或 ("remove", 名字)
+    ops: list[tuple] = field(default_factory=list)
+    updated: set[str] = field(default_factory=set)
+    # (名字, 检查时间, 异常像素数, 新增异常像素数)
+    checks: list[tuple[str, datetime.datetime, int, int]] = field(default_factory=list)
+
+    def merge(self, newer: 'PendingChanges'):
+        self.ops.extend(newer.ops)
+        self.updated |= newer.updated
+        self.checks.extend(newer.checks)
+
+
+class TomlAreaStore:
+    """所有区域保存在 data/areas.toml 中，每次写入整个文件，不保存检查记录"""
+    def load(self) -> list[dict]:
+        with open(app_path().get("data/areas.toml"), "rb") as f:
+            return tomllib.load(f)["areas"]
+
+    def write(self, areas: list[dict], changes: PendingChanges):
+        content = tomli_w.dumps({"areas": areas})
+        atomic_write(app_path().get("data/areas.toml"), content.encode("utf-8"))
+
+    def summary(self, name: str) -> dict | None:
+        return None
+
+    def history(self, name: str, limit: int) -> list[dict]:
+        return []
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS areas (
+    name TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    ignored INTEGER NOT NULL DEFAULT 0,
+    last_check_date TEXT,
+    last_diffs INTEGER,
+    last_new_diffs INTEGER,
+    check_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS areas_tile ON areas (x, y);
+CREATE TABLE IF NOT EXISTS checks (
+    name TEXT NOT NULL,
+    checked_at TEXT NOT NULL,
+    diffs INTEGER NOT NULL,
+    new_diffs INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS checks_name ON checks (name, checked_at);
+CREATE INDEX IF NOT EXISTS checks_time ON checks (checked_at);
+"""
+
+_UPSERT = """
+INSERT INTO areas (name, seq, x, y, ignored, last_check_date)
+VALUES (?, (SELECT COALESCE(MAX(seq), -1) + 1 FROM areas), ?, ?, ?, ?)
+ON CONFLICT (name) DO UPDATE SET
+    x = excluded.x, y = excluded.y,
+    ignored = excluded.ignored, last_check_date = excluded.last_check_date
+"""
+
+
+def _format_date(date: datetime.datetime | None) -> str | None:
+    return date.isoformat() if date is not None else None
+
+
+class SqliteAreaStore:
+    """
+    区域、检查时间、最近一次检查的统计和历史记录保存在 data/areas.db 中，
+    每次写入只更新修改过的区域，适合大量区域。
+    检查记录只保留最近 history_days 天（0 表示不限制）。
+    """
+    def __init__(self, path: str | None = None, history_days: int = 0):
+        self._path = path if path is not None else app_path().get("data/areas.db")
+        self._history_days = history_days
+
+    def _connect(self) -> sqlite3.Connection:
+        new = not os.path.exists(self._path)
+        conn = sqlite3.connect(self._path)
+        if new:
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def load(self) -> list[dict]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT name, x, y, ignored, last_check_date FROM areas ORDER BY seq"
+            ).fetchall()
+
+        areas = []
+        for name, x, y, ignored, last_check_date in rows:
+            area = {'name': name, 'position': {'x': x, 'y': y}, 'ignored': bool(ignored)}
+            if last_check_date is not None:
+                area['last_check_date'] = datetime.datetime.fromisoformat(last_check_date)
+            areas.append(area)
+        return areas
+
+    def write(self, areas: list[dict], changes: PendingChanges):
+        # 新区域排在最后，改名的区域保持原来的位置
+        rows = [
+            (
+                area['name'], area['position']['x'], area['position']['y'],
+                int(area['ignored']), _format_date(area.get('last_check_date')),
+            )
+            for area in areas if area['name'] in changes.updated
+        ]
+
+        with closing(self._connect()) as conn, conn:
+            for op in changes.ops:
+                if op[0] == "rename":
+                    conn.execute("UPDATE areas SET name = ? WHERE name = ?", (op[2], op[1]))
+                    conn.execute("UPDATE checks SET name = ? WHERE name = ?", (op[2], op[1]))
+                else:
+                    conn.execute("DELETE FROM areas WHERE name = ?", (op[1],))
+                    conn.execute("DELETE FROM checks WHERE name = ?", (op[1],))
+            conn.executemany(_UPSERT, rows)
+            checks = [(name, _format_date(date), diffs, new_diffs) for name, date, diffs, new_diffs in changes.checks]
+            conn.executemany("INSERT INTO checks VALUES (?, ?, ?, ?)", checks)
+            conn.executemany(
+                "UPDATE areas SET last_diffs = ?, last_new_diffs = ?, check_count = check_count + 1 WHERE name = ?",
+                [(diffs, new_diffs, name) for name, _, diffs, new_diffs in checks],
+            )
+            if checks and self._history_days > 0:
+                # 检查时间都是 UTC 的 ISO 格式，可以直接按字符串比较
+                expired = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=self._history_days)
+                conn.execute("DELETE FROM checks WHERE checked_at < ?", (_format_date(expired),))
+
+    def summary(self, name: str) -> dict | None:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT last_diffs, last_new_diffs, check_count FROM areas WHERE name = ?", (name,)
+            ).fetchone()
+        if row is None or row[2] == 0:
+            return None
+        return {'diffs': row[0], 'new_diffs': row[1], 'checks': row[2]}
+
+    def history(self, name: str, limit: int) -> list[dict]:
+        """最近 limit 次检查，按时间从新到旧"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT checked_at, diffs, new_diffs FROM checks WHERE name = ? ORDER BY checked_at DESC LIMIT ?",
+                (name, limit),
+            ).fetchall()
+        return [
+            {'date': datetime.datetime.fromisoformat(date), 'diffs': diffs, 'new_diffs': new_diffs}
+            for date, diffs, new_diffs in rows
+        ]
+
+
+def open_area_store(kind: str, history_days: int = 0) -> TomlAreaStore | SqliteAreaStore:
+    if kind == "sqlite":
+        return SqliteAreaStore(history_days=history_days)
+    return TomlAreaStore()
@@ -0,0 +1,62 @@
+import numpy as np
+from dataclasses import dataclass
+from src.core import palette
+
+# 分块摘要的块大小（像素），必须是 8 的倍数
+BLOCK_SIZE = 32
+
+# 固定的随机参数，保证同一内容在任何时候得到相同的摘要
+_rng = np.random.default_rng(0x77706C61)
+_WEIGHTS = _rng.integers(1, 2**63, size=(BLOCK_SIZE, BLOCK_SIZE // 8), dtype=np.uint64) | np.uint64(1)
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def grid_shape(height: int, width: int) -> tuple[int, int]:
+    return -(-height // BLOCK_SIZE), -(-width // BLOCK_SIZE)
+
+
+def block_of(indices: np.ndarray, width: int) -> np.ndarray:
+    """展平后的像素下标 -> 所在块的编号（按行优先）"""
+    ys, xs = np.divmod(indices, width)
+    return (ys // BLOCK_SIZE) * grid_shape(1, width)[1] + xs // BLOCK_SIZE
+
+
+@dataclass
+class BlockDigests:
+    """
+    以调色板下标计算的分块摘要。含有调色板外像素（palette.UNKNOWN）的块
+    无法用下标判断是否相同，标记在 unknown 中，比较时总是当作有变化。
+    """
+    # (块数,) uint64
+    digests: np.ndarray
+    # (块数,) bool
+    unknown: np.ndarray
+
+    @property
+    def nbytes(self) -> int:
+        return self.digests.nbytes + self.unknown.nbytes
+
+    @classmethod
+    def of(cls, indices: np.ndarray) -> 'BlockDigests':
+        height, width = indices.shape
+        bh, bw = grid_shape(height, width)
+        padded = np.zeros((bh * BLOCK_SIZE, bw * BLOCK_SIZE), dtype=np.uint8)
+        padded[:height, :width] = indices
+
+        # 每 8 个像素作为一个 uint64，经过可逆的混合后按位置加权求和
+        words = padded.view(np.uint64).reshape(bh, BLOCK_SIZE, bw, BLOCK_SIZE // 8)
+        mixed = words * _WEIGHTS[None, :, None, :]
+        mixed ^= mixed >> np.uint64(32)
+        mixed *= _MIX
+        digests = mixed.sum(axis=(1, 3), dtype=np.uint64)
+
+        unknown = (padded == palette.UNKNOWN).reshape(bh, BLOCK_SIZE, bw, BLOCK_SIZE).any(axis=(1, 3))
+        return cls(digests.reshape(-1), unknown.reshape(-1))
+
+    def changed(self, other: 'BlockDigests', blocks: np.ndarray) -> np.ndarray:
+        """blocks 中每个块是否可能有变化"""
+        return (
+            (self.digests[blocks] != other.digests[blocks])
+            | self.unknown[blocks]
+            | other.unknown[blocks]
+        )
@@ -1,147 +1,486 @@
-from collections import namedtuple
+from dataclasses import dataclass, field
 from PIL import Image
 import asyncio
+import httpx
 import numpy as np
 import datetime
+import contextlib
+import threading
+import time
 from src.core.settings import settings
 from src.core.logging import logger
-from src.core.area import area_manager, fetch_current_image
-from src.core.fs import app_path
-
-Diff = namedtuple("Diff", ["x", "y", "original", "current"])
+from src.core.area import area_manager
+from src.core.diffset import DiffSet
+from src.core.mask_index import MaskIndex
+from src.core.references import reference_cache
+from src.core import palette
+from src.core.engine import check_engine, run_cpu_bound
+from src.core.tiles import Tile, StaleTileCache, tile_cache, fetch_tile
+from src.core.results import CheckResult, result_memo
+from src.core.clusters import Cluster, cluster_diffs
+from src.core.diff_pool import SharedArray, compute_differences_in_process
+from src.core.throttle import TokenBucket, RetryPolicy, retry_hint
 
 def get_original_image(area: dict):
-    return Image.open(app_path().get(f"data/originals/{area['name']}.png")).convert("RGBA")
+    return Image.fromarray(reference_cache().original(area['name']))
 
 
 def get_mask_image(area: dict):
-    return Image.open(app_path().get(f"data/masks/{area['name']}.png")).convert("L")
+    return Image.fromarray(reference_cache().mask(area['name']))
 
 
-class CurrentImageFetcher:
-    def __init__(self):
-        self._cache = {}
-        self._is_last_from_cache = False
+@dataclass
+class CheckStats:
+    requests: int = 0
+    started: float = field(default_factory=time.monotonic)
+    finished: float | None = None
 
-    def is_last_from_cache(self) -> bool:
-        return self._is_last_from_cache
+    def elapsed(self) -> float:
+        end = self.finished if self.finished is not None else time.monotonic()
+        return max(end - self.started, 1e-6)
 
-    async def fetch(self, area: dict):
-        x = area["position"]["x"]
-        y = area["position"]["y"]
+    def throughput(self) -> float:
+        """每秒完成的网络请求数"""
+        return self.requests / self.elapsed()
 
-        if (x, y) in self._cache:
-            logger().info(f'从缓存中找到 `{area["name"]}` 所在区块')
-            self._is_last_from_cache = True
-            return self._cache[(x, y)]
-
-        image = await fetch_current_image(area)
-        self._cache[(x, y)] = image
-        self._is_last_from_cache = False
-        return image
-
-
-def compute_differences(
-        area_image: Image.Image,
-        current_image: Image.Image,
-        mask_image: Image.Image
-) -> list[Diff]:
-# 1. 将 PIL 图像转换为 NumPy 数组
-    arr_area = np.array(area_image)
-    arr_current = np.array(current_image)
-    arr_mask = np.array(mask_image)
-
-    # 2. 创建一个布尔掩码
-    # 遮罩的非零像素
-    valid_mask = arr_mask != 0
-
-    # 比较原始图像和当前图像，找出差异点
-    # '!=' 比较的是整个 RGBA 像素，返回一个 (H, W, 4) 的布尔数组
-    # 'any(axis=2)' 检查每个像素的 RGBA 值是否至少有一个不同
-    diff_mask = (arr_area != arr_current).any(axis=2)
-
-    # 3. 结合两个掩码，找出既在遮罩内又有差异的像素
-    # 这里的 & 是按位与操作，它将两个布尔数组的真值结合起来
-    final_mask = valid_mask & diff_mask
-
-    # 4. 使用 np.where 获取所有符合条件的像素的坐标
-    # np.where 返回一个元组，包含所有真值点的行和列索引
-    diff_coords_y, diff_coords_x = np.where(final_mask)
-
-    # 5. 提取差异点的原始像素值和当前像素值
-    # 使用高级索引一次性获取所有差异点的像素数据
-    original_pixels = arr_area[diff_coords_y, diff_coords_x]
-    current_pixels = arr_current[diff_coords_y, diff_coords_x]
-
-    # 6. 将结果转换为 Diff 命名元组的列表
-    # 使用 zip 将坐标和像素数据打包，然后用列表推导式创建 Diff 对象
-    diffs = [
-        Diff(x, y, tuple(original), tuple(current))
-        for x, y, original, current in zip(
-            diff_coords_x,
-            diff_coords_y,
-            original_pixels,
-            current_pixels
-        )
-    ]
-
-    return diffs
-
-
-def draw_differences(mask_image: Image.Image, diffs: list[Diff]):
-    highlight_color = (255, 0, 0, 255)
-
-    diff_image = mask_image.convert("RGBA")
-    arr = np.array(diff_image)
-    mask = (arr[:, :, :3] == (255, 255, 255)).all(axis=2)
-    arr[mask] = (255, 255, 255) + (210,)
-    mask = (arr[:, :, :3] == (0, 0, 0)).all(axis=2)
-    arr[mask] = (0, 0, 0) + (210,)
-
-    coords = np.array([(d.x, d.y) for d in diffs])
-    if coords.size > 0:
-        arr[coords[:, 1], coords[:, 0]] = highlight_color
-    return Image.fromarray(arr)
-
-async def monitor_all(areas: list[dict]):
-    results = {}
-    fetcher = CurrentImageFetcher()
-    for i, area in enumerate(areas):
+
+@dataclass
+class TileJob:
+    """一次网络请求：同一区块上所有需要检查的区域"""
+    x: int
+    y: int
+    areas: list[dict] = field(default_factory=list)
+    # 实际发起的网络请求数，使用缓存时为 0
+    requests: int = 0
+
+    def names(self) -> str:
+        return ", ".join(f'`{area["name"]}`' for area in self.areas)
+
+
+def plan_checks(areas: list[dict]) -> list[TileJob]:
+    """
+    按区块对未被忽略的区域进行分组，保持各区块第一次出现的顺序。
+    每个区块只需下载、解码一次，然后分发给其上的所有区域进行比较。
+    """
+    jobs: dict[tuple[int, int], TileJob] = {}
+    for area in areas:
         if area['ignored']:
             logger().warning(f'已跳过对 {area["name"]} 的检查')
             continue
 
-        failed = False
-        try:
-            results[area["name"]] = await _monitor_one(fetcher, area)
-        except Exception as e:
-            logger().warning(f'检查 {area["name"]} 失败')
-            failed = True
-        if i < len(areas) - 1:
-            wait_ms = settings().checker.wait_req_ms
-            if failed or not fetcher.is_last_from_cache():
-                logger().info(f'等待 {wait_ms}ms 后进行下次网络请求...')
-                await asyncio.sleep(wait_ms / 1000)
+        x = area["position"]["x"]
+        y = area["position"]["y"]
+        if (x, y) not in jobs:
+            jobs[(x, y)] = TileJob(x, y)
+        jobs[(x, y)].areas.append(area)
+
+    return list(jobs.values())
+
+
+class CurrentImageFetcher:
+    def __init__(
+            self,
+            client: httpx.AsyncClient,
+            stats: CheckStats,
+            rate_limiter: TokenBucket | None = None,
+            max_in_flight: int | None = None
+    ):
+        cfg = settings().checker
+        self._client = client
+        self._stats = stats
+        self._rate_limiter = rate_limiter
+        self._semaphore = asyncio.Semaphore(max_in_flight) if max_in_flight else None
+        self._breaker = check_engine().circuit_breaker()
+        self._retry = RetryPolicy(cfg.retry_attempts, cfg.retry_base_ms / 1000, cfg.retry_max_ms / 1000)
+
+    async def fetch(self, job: TileJob) -> Tile:
+        tile = await tile_cache().fresh(job.x, job.y)
+        if tile is not None:
+            logger().info(f'区块 ({job.x}, {job.y}) 刚刚获取过，使用缓存')
+            return tile
+
+        async with self._semaphore or contextlib.nullcontext():
+            attempt = 0
+            while True:
+                probe = await self._breaker.acquire()
+                try:
+                    if self._rate_limiter is not None:
+                        await self._rate_limiter.acquire()
+
+                    logger().info(f'正在获取区块 ({job.x}, {job.y})，包含区域 {job.names()}...')
+                    self._stats.requests += 1
+                    job.requests += 1
+                    try:
+                        tile = await fetch_tile(self._client, job.x, job.y)
+                    except StaleTileCache as e:
+                        # 服务器正常响应了，只是本地缓存已经失效，不计入重试次数
+                        self._breaker.record_success()
+                        logger().info(f'{e}，重新获取')
+                        continue
+                    except Exception as e:
+                        should_retry, retry_after = retry_hint(e)
+                        if not should_retry:
+                            # 服务器能正常响应（例如 404），不计入熔断
+                            self._breaker.record_success()
+                            raise
+                        self._breaker.record_failure()
+                        if attempt >= self._retry.attempts:
+                            raise
+
+                        delay = self._retry.delay(attempt, retry_after)
+                        attempt += 1
+                        logger().warning(
+                            f'获取区块 ({job.x}, {job.y}) 失败: {e}，'
+                            f'{delay:.1f} 秒后进行第 {attempt}/{self._retry.attempts} 次重试'
+                        )
+                        await asyncio.sleep(delay)
+                        continue
+
+                    self._breaker.record_success()
+                    return tile
+                finally:
+                    if probe is not None:
+                        # 探测请求被取消时没有记录结果，需要重新熔断，否则等待探测结果的请求会一直等下去
+                        self._breaker.abandon(probe)
+
+
+_workspace = threading.local()
+
+def compute_indexed_differences(area_name: str, tile: Tile, mask: MaskIndex) -> DiffSet:
+    """
+    参考图与区块在遮罩内的差异，比较的是调色板下标。
+    先比较遮罩所覆盖的块的摘要，只有摘要不同的块才逐像素比较。
+    """
+    references = reference_cache()
+    area_indices = references.original_indices(area_name)
+    indices = mask.indices
+    if area_indices.shape == tile.indices.shape:
+        changed_blocks = references.original_blocks(area_name).changed(tile.blocks, mask.blocks)
+        if not changed_blocks.any():
+            return DiffSet.empty()
+        indices = mask.select(changed_blocks)
+
+    return DiffSet(*diff_paletted(
+        area_indices,
+        tile.indices,
+        indices,
+        mask.width,
+        lambda: references.original(area_name),
+        lambda: tile.array
+    ))
+
+
+def compute_incremental_differences(
+        area_name: str,
+        previous: Tile,
+        previous_diffs: DiffSet,
+        tile: Tile,
+        mask: MaskIndex
+) -> tuple[DiffSet, DiffSet]:
+    """
+    在上一次检查结果的基础上计算新的差异：只重新比较自上次检查以来变化过的像素，
+    其余像素沿用上次的结果。返回 (全部差异, 自上次检查以来新出现的差异)。
+    """
+    if previous.indices.shape != tile.indices.shape:
+        diffs = compute_indexed_differences(area_name, tile, mask)
+        return diffs, diffs
+
+    changed_blocks = previous.blocks.changed(tile.blocks, mask.blocks)
+    if not changed_blocks.any():
+        return previous_diffs, DiffSet.empty()
+
+    # 1. 与上次的区块相比变化过的像素
+    width = mask.width
+    xs, ys, _, _ = diff_paletted(
+        previous.indices,
+        tile.indices,
+        mask.select(changed_blocks),
+        width,
+        lambda: previous.array,
+        lambda: tile.array
+    )
+    delta = ys.astype(np.int64) * width + xs
+
+    # 2. 这些像素与参考图的差异
+    references = reference_cache()
+    new_diffs = DiffSet(*diff_paletted(
+        references.original_indices(area_name),
+        tile.indices,
+        delta,
+        width,
+        lambda: references.original(area_name),
+        lambda: tile.array
+    ))
+
+    # 3. 用新的结果替换上次结果中的这些像素
+    kept = previous_diffs.filter(~np.isin(previous_diffs.flat(width), delta))
+    return DiffSet.concat(kept, new_diffs), new_diffs
+
+
+def _buffer(name: str, size: int, dtype) -> np.ndarray:
+    """
+    按线程复用的临时缓冲区，只在需要更大的空间时才重新分配，
+    避免每检查一个区域都分配几块完整大小的临时数组。
+    """
+    buf = getattr(_workspace, name, None)
+    if buf is None or buf.size < size or buf.dtype != dtype:
+        buf = np.empty(max(size, 1), dtype=dtype)
+        setattr(_workspace, name, buf)
+    return buf[:size]
+
+
+def pixel_words(arr: np.ndarray) -> np.ndarray:
+    """把 (H, W, 4) 的 uint8 RGBA 数组零拷贝地看作 (H*W,) 的 uint32 数组，每个像素一个字"""
+    arr = np.ascontiguousarray(arr, dtype=np.uint8)
+    return arr.reshape(-1).view(np.uint32)
+
 
+def diff_masked(
+        arr_area: np.ndarray,
+        arr_current: np.ndarray,
+        indices: np.ndarray,
+        width: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    比较 RGBA 像素的核心部分，只依赖 NumPy 数组，供进程池使用。
+    indices 为遮罩内像素展平后的下标，返回差异点的 x 坐标、y 坐标、原始像素和当前像素。
+    """
+    if arr_area.shape != arr_current.shape or arr_area.shape[1] != width:
+        raise ValueError(f"图片尺寸不一致: {arr_area.shape}, {arr_current.shape}")
+
+    # 1. 把每个 RGBA 像素当作一个 uint32 比较，一次比较代替四次比较再 any(axis=2)
+    area_words = pixel_words(arr_area)
+    current_words = pixel_words(arr_current)
+
+    # 2. 只取出遮罩内的像素进行比较，结果写入复用的缓冲区
+    n = len(indices)
+    area_masked = np.take(area_words, indices, out=_buffer("area", n, np.uint32), mode="clip")
+    current_masked = np.take(current_words, indices, out=_buffer("current", n, np.uint32), mode="clip")
+    changed = np.not_equal(area_masked, current_masked, out=_buffer("changed", n, np.bool_))
+
+    # 3. 差异点的坐标，顺序与 np.where 相同（先按行，再按列）
+    diff_coords_y, diff_coords_x = np.divmod(indices[changed], width)
+
+    # 4. 差异点的原始像素值和当前像素值，把 uint32 重新看作 4 个 uint8
+    original_pixels = area_masked[changed].view(np.uint8).reshape(-1, 4)
+    current_pixels = current_masked[changed].view(np.uint8).reshape(-1, 4)
+
+    return diff_coords_x, diff_coords_y, original_pixels, current_pixels
+
+
+def diff_paletted(
+        area_indices: np.ndarray,
+        current_indices: np.ndarray,
+        indices: np.ndarray,
+        width: int,
+        area_rgba,
+        current_rgba
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    diff_masked 的调色板版本，每个像素只比较 1 个字节。
+    area_rgba / current_rgba 是返回 RGBA 数组的函数，只在遇到调色板外的像素时才会调用。
+    """
+    if area_indices.shape != current_indices.shape or area_indices.shape[1] != width:
+        raise ValueError(f"图片尺寸不一致: {area_indices.shape}, {current_indices.shape}")
+
+    n = len(indices)
+    area_masked = np.take(area_indices.reshape(-1), indices, out=_buffer("area_idx", n, np.uint8), mode="clip")
+    current_masked = np.take(current_indices.reshape(-1), indices, out=_buffer("current_idx", n, np.uint8), mode="clip")
+    changed = np.not_equal(area_masked, current_masked, out=_buffer("changed", n, np.bool_))
+
+    # 调色板内的颜色各不相同，只有两边都是 UNKNOWN 时下标相等不代表像素相等，需要比较完整的 RGBA
+    both_unknown = np.flatnonzero((area_masked == palette.UNKNOWN) & (current_masked == palette.UNKNOWN))
+    if len(both_unknown) > 0:
+        positions = indices[both_unknown]
+        changed[both_unknown] = pixel_words(area_rgba())[positions] != pixel_words(current_rgba())[positions]
+
+    changed_positions = indices[changed]
+    diff_coords_y, diff_coords_x = np.divmod(changed_positions, width)
+
+    def _pixels(masked: np.ndarray, rgba) -> np.ndarray:
+        codes = masked[changed]
+        pixels = palette.PALETTE_RGBA[codes]
+        unknown = codes == palette.UNKNOWN
+        if unknown.any():
+            words = pixel_words(rgba())[changed_positions[unknown]]
+            pixels[unknown] = words.view(np.uint8).reshape(-1, 4)
+        return pixels
+
+    return diff_coords_x, diff_coords_y, _pixels(area_masked, area_rgba), _pixels(current_masked, current_rgba)
+
+
+def _blend_table(overlay: np.ndarray, alpha: np.ndarray) -> np.ndarray:
+    """
+    (256, 256) 的查找表：table[v, base] 为把值为 overlay[v]、透明度为 alpha[v] 的像素
+    叠加到 base 上的结果，与 PIL 的 Image.paste(im, box, im) 相同
+    """
+    base = np.arange(256, dtype=np.uint32)[None, :]
+    tmp = base * (255 - alpha[:, None]) + overlay[:, None] * alpha[:, None] + 128
+    return (((tmp >> 8) + tmp) >> 8).astype(np.uint8)
+
+
+# 遮罩灰度值 v 对应的叠加像素为 (v, v, v, a)：纯白、纯黑半透明，其他灰度不透明
+_OVERLAY_ALPHA = np.full(256, 255, dtype=np.uint32)
+_OVERLAY_ALPHA[[0, 255]] = 210
+_BLEND_RGB = _blend_table(np.arange(256, dtype=np.uint32), _OVERLAY_ALPHA)
+_BLEND_ALPHA = _blend_table(_OVERLAY_ALPHA, _OVERLAY_ALPHA)
+
+
+def render_diff_view(current: np.ndarray, mask: np.ndarray, diffs: DiffSet) -> Image.Image:
+    """
+    在当前区块上叠加遮罩并用红色标出异常像素，得到详情页展示的差异图。
+    每个通道只查一次表，不需要先生成单独的叠加图再合成。
+    """
+    if current.shape[:2] != mask.shape[:2]:
+        raise ValueError(f"图片尺寸不一致: {current.shape}, {mask.shape}")
+
+    view = np.empty(current.shape, dtype=np.uint8)
+    view[..., :3] = _BLEND_RGB[mask[..., None], current[..., :3]]
+    view[..., 3] = _BLEND_ALPHA[mask, current[..., 3]]
+    view[diffs.ys, diffs.xs] = (255, 0, 0, 255)
+    return Image.fromarray(view)
+
+async def monitor_all(areas: list[dict], stats: CheckStats | None = None):
+    results = {}
+    stats = stats if stats is not None else CheckStats()
+    if settings().checker.concurrent:
+        await _monitor_concurrently(areas, results, stats)
+    else:
+        await _monitor_serially(areas, results, stats)
+
+    stats.finished = time.monotonic()
+    logger().info(f'本次检查共发起 {stats.requests} 次网络请求，平均 {stats.throughput():.2f} 次/秒')
     area_manager().save()
+    tile_cache().save()
     return results
 
-async def _monitor_one(fetcher: CurrentImageFetcher, area: dict) -> dict:
-    current_image = await fetcher.fetch(area)
-    
-    original_image = get_original_image(area)
-    mask_image = get_mask_image(area)
-
-    logger().info(f'正在检查异常...')
-    diffs = compute_differences(original_image, current_image, mask_image)
-    logger().info(f'正在生成结果展示图...')
-    diff_image = draw_differences(mask_image, diffs)
-    result = {
-        "diffs": diffs,
-        "diff_image": diff_image,
-        "current_image": current_image,
-        "original_image": original_image,
-        "mask_image": mask_image
-    }
-    area['last_check_date'] = datetime.datetime.now(datetime.timezone.utc)
-    return result
\ No newline at end of file
+async def _monitor_serially(areas: list[dict], results: dict, stats: CheckStats):
+    fetcher = CurrentImageFetcher(check_engine().client(), stats)
+    jobs = plan_checks(areas)
+    # 比较差异在线程池中进行，与后续的网络请求（以及请求间的等待）同时进行
+    pending = []
+    for i, job in enumerate(jobs):
+        tile = await _fetch_job(fetcher, job)
+        if tile is not None:
+            pending.append(asyncio.ensure_future(_check_job(tile, job, results)))
+        # 只有实际发起了网络请求才需要等待，使用缓存的区块不会增加服务器负担
+        if job.requests > 0 and i < len(jobs) - 1:
+            wait_ms = settings().checker.wait_req_ms
+            logger().info(f'等待 {wait_ms}ms 后进行下次网络请求...')
+            await asyncio.sleep(wait_ms / 1000)
+    await asyncio.gather(*pending)
+
+async def _monitor_concurrently(areas: list[dict], results: dict, stats: CheckStats):
+    cfg = settings().checker
+    fetcher = CurrentImageFetcher(
+        check_engine().client(),
+        stats,
+        rate_limiter=check_engine().rate_limiter(),
+        max_in_flight=cfg.max_in_flight
+    )
+
+    async def _monitor_job(job: TileJob):
+        tile = await _fetch_job(fetcher, job)
+        if tile is not None:
+            await _check_job(tile, job, results)
+
+    await asyncio.gather(*[_monitor_job(job) for job in plan_checks(areas)])
+
+async def _fetch_job(fetcher: CurrentImageFetcher, job: TileJob) -> Tile | None:
+    try:
+        return await fetcher.fetch(job)
+    except Exception as e:
+        logger().warning(f'获取区块 ({job.x}, {job.y}) 失败，无法检查 {job.names()}: {e}')
+        return None
+
+async def _check_job(tile: Tile, job: TileJob, results: dict):
+    async def _check_area(area: dict, check):
+        try:
+            result = await check(area)
+        except Exception as e:
+            logger().warning(f'检查 {area["name"]} 失败: {e}')
+            return False
+        if result is None:
+            return True
+        results[area["name"]] = result
+        return False
+
+    # 先沿用之前的检查结果，区块未变化时不需要解码区块
+    reused = await asyncio.gather(*[_check_area(area, lambda a: _reuse_result(tile, a)) for area in job.areas])
+    pending = [area for area, missing in zip(job.areas, reused) if missing]
+    if not pending:
+        return
+
+    memo = result_memo()
+    if settings().checker.diff_processes > 0 and any(memo.previous(tile, area) is None for area in pending):
+        # 只有需要完整比较的区域才使用子进程（增量比较不需要）；
+        # 同一区块只复制一次到共享内存，供该区块上所有区域的子进程读取
+        await tile.load()
+        with SharedArray(tile.array) as shared_tile:
+            await asyncio.gather(*[_check_area(area, lambda a: _compute_result(tile, a, shared_tile)) for area in pending])
+    else:
+        await asyncio.gather(*[_check_area(area, lambda a: _compute_result(tile, a, None)) for area in pending])
+
+async def _reuse_result(tile: Tile, area: dict) -> CheckResult | None:
+    """区块、参考图和遮罩都与之前检查时相同时沿用之前的结果，否则返回 None"""
+    memo = result_memo()
+    result = memo.get(tile, area)
+    if result is not None:
+        logger().info(f'`{area["name"]}` 所在区块未变化，沿用上次检查结果')
+        area_manager().mark_checked(area['name'], datetime.datetime.now(datetime.timezone.utc), len(result['diffs']))
+        return result.replace(new_diffs=DiffSet.empty())
+
+    diffs = await run_cpu_bound(memo.load, tile, area)
+    if diffs is None:
+        return None
+    # 程序重启前已经检查过相同的区块，无需解码区块或比较差异
+    logger().info(f'`{area["name"]}` 所在区块与上次检查时相同，沿用保存的检查结果')
+    return await _finish_result(tile, area, diffs, DiffSet.empty())
+
+async def _compute_result(tile: Tile, area: dict, shared_tile: SharedArray | None) -> CheckResult:
+    memo = result_memo()
+    mask_index = await run_cpu_bound(reference_cache().mask_index, area['name'])
+    await tile.load()
+
+    previous = memo.previous(tile, area)
+    if previous is not None:
+        logger().info(f'正在检查 `{area["name"]}` 自上次检查以来的变化...')
+        diffs, new_diffs = await run_cpu_bound(compute_incremental_differences, area['name'], *previous, tile, mask_index)
+    else:
+        logger().info(f'正在检查 `{area["name"]}` 的异常（共 {mask_index.count} 个像素）...')
+        if shared_tile is not None:
+            original = await run_cpu_bound(reference_cache().original, area['name'])
+            diffs = await compute_differences_in_process(original, shared_tile, mask_index)
+        else:
+            diffs = await run_cpu_bound(compute_indexed_differences, area['name'], tile, mask_index)
+        new_diffs = diffs
+    await run_cpu_bound(memo.save, tile, area, diffs)
+    return await _finish_result(tile, area, diffs, new_diffs)
+
+async def _finish_result(tile: Tile, area: dict, diffs: DiffSet, new_diffs: DiffSet) -> CheckResult:
+    clusters = await run_cpu_bound(cluster_diffs, diffs)
+    # 压缩区块比较耗时，不能在事件循环中进行；之后 memo.put 直接使用已生成的副本
+    snapshot = await tile.pack()
+    result = _make_result(area['name'], snapshot, diffs, new_diffs, clusters)
+    result_memo().put(tile, area, result)
+    area_manager().mark_checked(area['name'], datetime.datetime.now(datetime.timezone.utc), len(diffs), len(new_diffs))
+    return result
+
+def _make_result(name: str, snapshot: Tile, diffs: DiffSet, new_diffs: DiffSet, clusters: list[Cluster]) -> CheckResult:
+    # 图片都在第一次访问（打开详情）时才生成，只发送通知的检查不会处理任何像素；
+    # 结果只引用区块的压缩副本（tile.snapshot），不会让解码后的区块一直留在内存中
+    return CheckResult(
+        {
+            "diffs": diffs,
+            # 自上次检查以来新出现（或颜色再次改变）的异常像素
+            "new_diffs": new_diffs,
+            # 相连的异常像素分组，按像素数从多到少，最多 20 组
+            "clusters": clusters,
+        },
+        lazy={
+            "original_image": lambda: Image.fromarray(reference_cache().original(name)),
+            "mask_image": lambda: Image.fromarray(reference_cache().mask(name)),
+            "current_image": lambda: Image.fromarray(snapshot.rgba()),
+            "diff_view": lambda: render_diff_view(snapshot.rgba(), reference_cache().mask(name), diffs),
+        }
+    )
@@ -0,0 +1,133 @@
+import numpy as np
+from dataclasses import dataclass
+from src.core.diffset import DiffSet
+from src.core import palette
+
+
+@dataclass
+class Cluster:
+    """一组相连的异常像素"""
+    count: int
+    # (left, top, right, bottom)，右、下边界不包含在内
+    bbox: tuple[int, int, int, int]
+    centroid: tuple[float, float]
+    # 区域内出现最多的当前颜色（RGBA）
+    color: tuple[int, int, int, int]
+
+    @property
+    def color_name(self) -> str:
+        return palette.color_names(np.array([self.color]))[0]
+
+
+def _runs(diffs: DiffSet, gap: int) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """把同一行中间隔不超过 gap 的像素合并为一段，返回每段的起始下标、y、起止 x"""
+    xs, ys = diffs.xs, diffs.ys
+    breaks = np.ones(len(xs), dtype=bool)
+    breaks[1:] = (ys[1:] != ys[:-1]) | (xs[1:] - xs[:-1] > gap)
+    starts = np.flatnonzero(breaks)
+    ends = np.append(starts[1:], len(xs)) - 1
+    return starts, ys[starts], xs[starts], xs[ends]
+
+
+def _edges(run_y, run_x0, run_x1, gap: int) -> tuple[np.ndarray, np.ndarray]:
+    """相距不超过 gap 行、水平方向上重叠（允许 gap 的间隔）的两段之间的边"""
+    # 每行的段按起点排序且互不重叠，终点也是有序的，可以用二分查找确定相邻行中与之重叠的范围
+    width = int(run_x1.max()) + 2 * gap + 2
+    start_keys = run_y.astype(np.int64) * width + run_x0
+    end_keys = run_y.astype(np.int64) * width + run_x1
+
+    sources, targets = [], []
+    for d in range(1, gap + 1):
+        row = (run_y.astype(np.int64) - d) * width
+        lo = np.searchsorted(end_keys, row + run_x0 - gap, side="left")
+        hi = np.searchsorted(start_keys, row + run_x1 + gap, side="right")
+        counts = np.maximum(hi - lo, 0)
+        total = int(counts.sum())
+        if total == 0:
+            continue
+        offsets = np.repeat(np.cumsum(counts) - counts, counts)
+        sources.append(np.repeat(np.arange(len(run_y)), counts))
+        targets.append(np.repeat(lo, counts) + np.arange(total) - offsets)
+
+    if not sources:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(sources), np.concatenate(targets)
+
+
+def _components(n: int, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """无向图的连通分量，返回每个节点所在分量中最小的节点编号"""
+    labels = np.arange(n)
+    while True:
+        # 压缩路径，使每个节点直接指向根
+        while True:
+            compressed = labels[labels]
+            if np.array_equal(compressed, labels):
+                break
+            labels = compressed
+
+        ls, lt = labels[sources], labels[targets]
+        differ = ls != lt
+        if not differ.any():
+            return labels
+        # 把编号较大的根挂到编号较小的根上
+        np.minimum.at(labels, np.maximum(ls[differ], lt[differ]), np.minimum(ls[differ], lt[differ]))
+
+
+def cluster_diffs(diffs: DiffSet, gap: int = 1, limit: int | None = 20) -> list[Cluster]:
+    """
+    把异常像素按连通性分组（gap 为 1 时即八连通），按像素数从多到少返回前 limit 组。
+    先把每行的像素合并为段，只在段之间求连通分量，大量相邻像素也只需要少量计算。
+    """
+    if len(diffs) == 0:
+        return []
+
+    starts, run_y, run_x0, run_x1 = _runs(diffs, gap)
+    sources, targets = _edges(run_y, run_x0, run_x1, gap)
+    labels = _components(len(starts), sources, targets)
+    _, run_cluster = np.unique(labels, return_inverse=True)
+    n_clusters = int(run_cluster.max()) + 1
+
+    run_counts = np.diff(np.append(starts, len(diffs)))
+    counts = np.bincount(run_cluster, weights=run_counts, minlength=n_clusters).astype(np.int64)
+    order = np.argsort(-counts, kind="stable")
+    if limit is not None:
+        order = order[:limit]
+
+    # 只为返回的分组统计范围和颜色
+    rank = np.full(n_clusters, -1)
+    rank[order] = np.arange(len(order))
+    run_rank = rank[run_cluster]
+    runs = np.flatnonzero(run_rank >= 0)
+    runs = runs[np.argsort(run_rank[runs], kind="stable")]
+    bounds = np.searchsorted(run_rank[runs], np.arange(len(order)))
+    left = np.minimum.reduceat(run_x0[runs], bounds)
+    right = np.maximum.reduceat(run_x1[runs], bounds) + 1
+    top = np.minimum.reduceat(run_y[runs], bounds)
+    bottom = np.maximum.reduceat(run_y[runs], bounds) + 1
+
+    sum_x = np.bincount(run_rank[runs], weights=np.add.reduceat(diffs.xs.astype(np.int64), starts)[runs], minlength=len(order))
+    sum_y = np.bincount(run_rank[runs], weights=run_y[runs].astype(np.float64) * run_counts[runs], minlength=len(order))
+
+    # 按调色板下标计数，调色板外的颜色取该组中第一个这样的像素
+    pixel_rank = np.repeat(run_rank, run_counts)
+    selected = np.flatnonzero(pixel_rank >= 0)
+    codes = palette.encode(diffs.current[selected])
+    votes = np.bincount(pixel_rank[selected] * 256 + codes, minlength=len(order) * 256).reshape(len(order), 256)
+    dominant = votes.argmax(axis=1)
+
+    clusters = []
+    for i, c in enumerate(order.tolist()):
+        code = int(dominant[i])
+        if code == palette.UNKNOWN:
+            first = selected[np.flatnonzero((pixel_rank[selected] == i) & (codes == code))[0]]
+            color = tuple(diffs.current[first].tolist())
+        else:
+            color = tuple(palette.PALETTE_RGBA[code].tolist())
+        count = int(counts[c])
+        clusters.append(Cluster(
+            count=count,
+            bbox=(int(left[i]), int(top[i]), int(right[i]), int(bottom[i])),
+            centroid=(float(sum_x[i] / count), float(sum_y[i] / count)),
+            color=color,
+        ))
+    return clusters
@@ -0,0 +1,83 @@
+import asyncio
+import numpy as np
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from PIL import Image
+from src.core.engine import check_engine
+from src.core.diffset import DiffSet
+from src.core.mask_index import MaskIndex
+
+
+@dataclass(frozen=True)
+class SharedArraySpec:
+    """在进程间传递的共享数组描述，只包含名字和形状，体积很小"""
+    name: str
+    shape: tuple[int, ...]
+    dtype: str
+
+
+class SharedArray:
+    """把数组复制到一块共享内存中，离开 with 语句块时释放"""
+    def __init__(self, array: np.ndarray):
+        array = np.ascontiguousarray(array)
+        self._shm = SharedMemory(create=True, size=max(array.nbytes, 1))
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=self._shm.buf)
+        view[...] = array
+        del view
+        self.spec = SharedArraySpec(self._shm.name, array.shape, array.dtype.str)
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self) -> 'SharedArray':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _attach(spec: SharedArraySpec) -> SharedMemory:
+    # spawn 出来的子进程与父进程共用同一个 resource_tracker，
+    # 共享内存的生命周期完全由父进程中的 SharedArray 管理
+    return SharedMemory(name=spec.name)
+
+
+def _diff_worker(area_spec: SharedArraySpec, current_spec: SharedArraySpec, indices_spec: SharedArraySpec, width: int):
+    from src.core.check import diff_masked
+
+    specs = (area_spec, current_spec, indices_spec)
+    handles = [_attach(spec) for spec in specs]
+    try:
+        arrays = [
+            np.ndarray(spec.shape, dtype=np.dtype(spec.dtype), buffer=shm.buf)
+            for spec, shm in zip(specs, handles)
+        ]
+        # 高级索引返回的是副本，不会引用共享内存
+        result = diff_masked(*arrays, width)
+        del arrays
+        return result
+    finally:
+        for shm in handles:
+            shm.close()
+
+
+async def compute_differences_in_process(
+        area_image: Image.Image | np.ndarray,
+        current: SharedArray,
+        mask_index: MaskIndex
+) -> DiffSet:
+    """比较参考图与区块在遮罩内的 RGBA 像素，比较在子进程中进行"""
+    with SharedArray(np.asarray(area_image)) as area, SharedArray(mask_index.indices) as indices:
+        loop = asyncio.get_running_loop()
+        arrays = await loop.run_in_executor(
+            check_engine().process_executor(),
+            _diff_worker,
+            area.spec,
+            current.spec,
+            indices.spec,
+            mask_index.width
+        )
+    return DiffSet(*arrays)
@@ -0,0 +1,84 @@
+from collections import namedtuple
+from typing import Iterator
+import numpy as np
+
+Diff = namedtuple("Diff", ["x", "y", "original", "current"])
+
+
+class DiffSet:
+    """
+    以数组形式保存的一组异常像素（struct of arrays），代替由 Diff 命名元组组成的列表：
+    - xs, ys: (N,) 坐标；
+    - original, current: (N, 4) RGBA 像素。
+    迭代时才逐个生成 Diff，切片和筛选都是向量化操作。
+    """
+    __slots__ = ("xs", "ys", "original", "current")
+
+    def __init__(self, xs: np.ndarray, ys: np.ndarray, original: np.ndarray, current: np.ndarray):
+        self.xs = np.asarray(xs, dtype=np.int32)
+        self.ys = np.asarray(ys, dtype=np.int32)
+        self.original = np.asarray(original, dtype=np.uint8).reshape(-1, 4)
+        self.current = np.asarray(current, dtype=np.uint8).reshape(-1, 4)
+
+    @classmethod
+    def empty(cls) -> 'DiffSet':
+        return cls(
+            np.empty(0, dtype=np.int32),
+            np.empty(0, dtype=np.int32),
+            np.empty((0, 4), dtype=np.uint8),
+            np.empty((0, 4), dtype=np.uint8)
+        )
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    def __iter__(self) -> Iterator[Diff]:
+        for x, y, original, current in zip(
+            self.xs.tolist(),
+            self.ys.tolist(),
+            self.original.tolist(),
+            self.current.tolist()
+        ):
+            yield Diff(x, y, tuple(original), tuple(current))
+
+    def __getitem__(self, index):
+        """整数下标返回 Diff；切片、布尔数组或下标数组返回新的 DiffSet"""
+        if isinstance(index, (int, np.integer)):
+            return Diff(
+                int(self.xs[index]),
+                int(self.ys[index]),
+                tuple(self.original[index].tolist()),
+                tuple(self.current[index].tolist())
+            )
+        return DiffSet(self.xs[index], self.ys[index], self.original[index], self.current[index])
+
+    def __repr__(self) -> str:
+        return f"DiffSet({len(self)} diffs)"
+
+    def filter(self, mask: np.ndarray) -> 'DiffSet':
+        return self[np.asarray(mask, dtype=bool)]
+
+    def within(self, left: int, top: int, right: int, bottom: int) -> 'DiffSet':
+        """保留位于 [left, right) x [top, bottom) 内的像素"""
+        return self.filter((self.xs >= left) & (self.xs < right) & (self.ys >= top) & (self.ys < bottom))
+
+    def coords(self) -> np.ndarray:
+        """(N, 2) 的 (x, y) 坐标数组"""
+        return np.stack([self.xs, self.ys], axis=1)
+
+    def flat(self, width: int) -> np.ndarray:
+        """展平后的像素下标（行优先）"""
+        return self.ys.astype(np.int64) * width + self.xs
+
+    @classmethod
+    def concat(cls, *sets: 'DiffSet') -> 'DiffSet':
+        """按行优先顺序合并多个 DiffSet"""
+        xs = np.concatenate([s.xs for s in sets])
+        ys = np.concatenate([s.ys for s in sets])
+        order = np.lexsort((xs, ys))
+        return cls(
+            xs[order],
+            ys[order],
+            np.concatenate([s.original for s in sets])[order],
+            np.concatenate([s.current for s in sets])[order]
+        )
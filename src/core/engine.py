@@ -0,0 +1,153 @@
+import asyncio
+import functools
+import os
+import threading
+import importlib.util
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import httpx
+from src.core.settings import settings
+from src.core.logging import logger
+from src.core.throttle import TokenBucket, CircuitBreaker
+
+
+def new_http_client() -> httpx.AsyncClient:
+    cfg = settings().checker
+    http2 = cfg.http2
+    if http2 and importlib.util.find_spec('h2') is None:
+        logger().warning('未安装 h2，已回退到 HTTP/1.1')
+        http2 = False
+
+    limits = httpx.Limits(
+        max_connections=cfg.max_connections,
+        max_keepalive_connections=cfg.max_keepalive_connections,
+        keepalive_expiry=cfg.keepalive_expiry_ms / 1000,
+    )
+    timeout = httpx.Timeout(cfg.timeout_ms / 1000, connect=cfg.connect_timeout_ms / 1000)
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+
+
+class CheckEngine:
+    """
+    在后台线程中运行一个常驻的事件循环，并持有整个程序共用的 HTTP 连接池，
+    这样每次检查都可以复用已经建立好的 TCP/TLS 连接。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._client: httpx.AsyncClient | None = None
+        self._rate_limiter: TokenBucket | None = None
+        self._rate_limiter_params: tuple[float, int] | None = None
+        self._circuit_breaker: CircuitBreaker | None = None
+        self._circuit_breaker_params: tuple[int, float, float, float] | None = None
+        self._cpu_executor: ThreadPoolExecutor | None = None
+        self._process_executor: ProcessPoolExecutor | None = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name='check-engine',
+                    daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    def run(self, coro):
+        """在引擎的事件循环上执行协程，并阻塞等待其结果。"""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def client(self) -> httpx.AsyncClient:
+        """只能在引擎的事件循环中调用。"""
+        if self._client is None:
+            self._client = new_http_client()
+        return self._client
+
+    def rate_limiter(self) -> TokenBucket:
+        """
+        所有检查共用同一个令牌桶，保证同时进行的检查加起来也不会超过限速。
+        设置中的限速改变后重新创建，不需要重启程序。
+        """
+        cfg = settings().checker
+        params = (cfg.rate_limit_rps, cfg.rate_limit_burst)
+        if self._rate_limiter is None or self._rate_limiter_params != params:
+            self._rate_limiter = TokenBucket(*params)
+            self._rate_limiter_params = params
+        return self._rate_limiter
+
+    def circuit_breaker(self) -> CircuitBreaker:
+        """与令牌桶一样，设置中的熔断参数改变后重新创建"""
+        cfg = settings().checker
+        params = (
+            cfg.breaker_threshold,
+            cfg.breaker_cooldown_ms / 1000,
+            cfg.breaker_max_cooldown_ms / 1000,
+            cfg.breaker_max_wait_ms / 1000
+        )
+        if self._circuit_breaker is None or self._circuit_breaker_params != params:
+            self._circuit_breaker = CircuitBreaker(*params)
+            self._circuit_breaker_params = params
+        return self._circuit_breaker
+
+    def cpu_executor(self) -> ThreadPoolExecutor:
+        """用于解码 PNG 和计算差异的线程池（NumPy 和 Pillow 在计算时会释放 GIL）"""
+        with self._lock:
+            if self._cpu_executor is None:
+                workers = settings().checker.cpu_workers or os.cpu_count() or 1
+                self._cpu_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='check-cpu')
+            return self._cpu_executor
+
+    def process_executor(self) -> ProcessPoolExecutor:
+        """用于比较差异的进程池，只在 checker.diff_processes > 0 时使用"""
+        with self._lock:
+            if self._process_executor is None:
+                # 使用 spawn，避免在持有线程和 Qt 状态的进程中 fork
+                self._process_executor = ProcessPoolExecutor(
+                    max_workers=settings().checker.diff_processes,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._process_executor
+
+    def close(self):
+        if self._loop is None:
+            return
+
+        if self._client is not None:
+            try:
+                self.run(self._client.aclose())
+            except Exception as e:
+                logger().warning(f'关闭 HTTP 连接池失败: {e}')
+            self._client = None
+        self._rate_limiter = None
+        self._rate_limiter_params = None
+        self._circuit_breaker = None
+        self._circuit_breaker_params = None
+
+        if self._cpu_executor is not None:
+            self._cpu_executor.shutdown(wait=True)
+            self._cpu_executor = None
+        if self._process_executor is not None:
+            self._process_executor.shutdown(wait=True)
+            self._process_executor = None
+
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+        self._thread = None
+
+
+async def run_cpu_bound(func, *args, **kwargs):
+    """在 CPU 线程池中执行 func，不阻塞事件循环"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(check_engine().cpu_executor(), functools.partial(func, *args, **kwargs))
+
+
+_check_engine = CheckEngine()
+
+def check_engine() -> CheckEngine:
+    return _check_engine
@@ -17,9 +17,30 @@ class AppPath:
     def get_original_image(self, area_name: str):
         return self.get(f"data/originals/{area_name}.png")
 
+    def get_mask(self, area_name: str):
+        return self.get(f"data/masks/{area_name}.mask")
+
     def get_mask_image(self, area_name: str):
+        """旧版本保存的 PNG 遮罩，转换为 .mask 文件后保留作为备份"""
         return self.get(f"data/masks/{area_name}.png")
 
+    def get_mask_index(self, area_name: str):
+        return self.get(f"data/masks/{area_name}.idx.npz")
+
+    def get_tile_cache(self, x: int, y: int, fetched_at: int):
+        return self.get(f"data/cache/tiles/{x}_{y}_{fetched_at}.png")
+
+    def get_result_cache(self, area_name: str):
+        return self.get(f"data/cache/results/{area_name}.npz")
+
+def file_stamp(path: str) -> tuple[int, int] | None:
+    """文件的修改时间（纳秒）和大小，用来判断文件是否被修改过；文件不存在时为 None"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
 _app_path = AppPath()
 
 def app_path() -> AppPath:
@@ -0,0 +1,50 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+
+class SizedLRU:
+    """
+    按字节数限制大小的 LRU：放入条目后总大小超过 budget() 字节时淘汰最久未使用的条目，
+    至少保留刚放入的一条。nbytes 计算单个值占用的字节数。
+    """
+    def __init__(self, budget: Callable[[], int], nbytes: Callable[[object], int]):
+        self._budget = budget
+        self._nbytes = nbytes
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, object] = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key: Hashable):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value):
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = value
+            self._bytes += self._nbytes(value)
+
+            budget = self._budget()
+            while self._bytes > budget and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self._nbytes(evicted)
+
+    def pop(self, key: Hashable):
+        with self._lock:
+            return self._pop(key)
+
+    def discard(self, predicate: Callable[[Hashable], bool]):
+        """删除键满足 predicate 的所有条目"""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self._pop(key)
+
+    def _pop(self, key: Hashable):
+        value = self._entries.pop(key, None)
+        if value is not None:
+            self._bytes -= self._nbytes(value)
+        return value
@@ -0,0 +1,53 @@
+import struct
+import zlib
+import numpy as np
+from src.core.fs import app_path
+from src.core.persist import atomic_write
+
+# 文件头：标识、版本、宽、高、外接矩形 (left, top, right, bottom)，
+# 之后是外接矩形内按行 np.packbits 的位图（zlib 压缩）
+_MAGIC = b"WPMK"
+_VERSION = 1
+_HEADER = struct.Struct("<4sB3x6I")
+
+
+def pack(mask: np.ndarray) -> bytes:
+    """把 (H, W) 遮罩中非零的像素压缩为每像素一位"""
+    bits = np.asarray(mask) != 0
+    height, width = bits.shape[:2]
+    rows = np.flatnonzero(bits.any(axis=1))
+    if len(rows) == 0:
+        return _HEADER.pack(_MAGIC, _VERSION, width, height, 0, 0, 0, 0)
+
+    cols = np.flatnonzero(bits.any(axis=0))
+    left, top, right, bottom = int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+    packed = np.packbits(bits[top:bottom, left:right], axis=1)
+    return _HEADER.pack(_MAGIC, _VERSION, width, height, left, top, right, bottom) + zlib.compress(packed.tobytes(), 1)
+
+
+def unpack(data: bytes) -> np.ndarray:
+    """还原为 (H, W) 的 uint8 遮罩，遮罩内为 255，其余为 0"""
+    magic, version, width, height, left, top, right, bottom = _HEADER.unpack_from(data)
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError("不是有效的遮罩文件")
+
+    mask = np.zeros((height, width), dtype=np.uint8)
+    if right > left and bottom > top:
+        row_bytes = (right - left + 7) // 8
+        packed = np.frombuffer(zlib.decompress(memoryview(data)[_HEADER.size:]), dtype=np.uint8)
+        bits = np.unpackbits(packed.reshape(bottom - top, row_bytes), axis=1, count=right - left)
+        np.multiply(bits, 255, out=mask[top:bottom, left:right])
+    return mask
+
+
+def read_mask(path: str) -> np.ndarray:
+    with open(path, "rb") as f:
+        return unpack(f.read())
+
+
+def write_mask(path: str, mask: np.ndarray):
+    atomic_write(path, pack(mask))
+
+
+def load_mask(area_name: str) -> np.ndarray:
+    return read_mask(app_path().get_mask(area_name))
@@ -0,0 +1,112 @@
+import io
+import os
+import numpy as np
+from dataclasses import dataclass
+from src.core.fs import app_path, file_stamp
+from src.core.logging import logger
+from src.core.blocks import BLOCK_SIZE, block_of
+from src.core.mask_file import read_mask
+from src.core.persist import atomic_write
+
+
+@dataclass
+class MaskIndex:
+    """
+    遮罩的预计算索引：遮罩内像素在展平后的下标（行优先），以及外接矩形。
+    比较时只需要访问这些像素，不必每次都扫描整张遮罩。
+    另外按分块（blocks.BLOCK_SIZE）分组，便于只比较摘要有变化的块。
+    """
+    width: int
+    height: int
+    # 展平后的下标，uint32
+    indices: np.ndarray
+    # (left, top, right, bottom)，右、下边界不包含在内；遮罩为空时为 (0, 0, 0, 0)
+    bbox: tuple[int, int, int, int]
+    # 与遮罩相交的块编号，升序
+    blocks: np.ndarray
+    # 按块分组后的 indices，第 i 个块的像素为 block_order[block_offsets[i]:block_offsets[i + 1]]
+    block_order: np.ndarray
+    block_offsets: np.ndarray
+
+    @property
+    def count(self) -> int:
+        return len(self.indices)
+
+    @classmethod
+    def build(cls, mask: np.ndarray) -> 'MaskIndex':
+        height, width = mask.shape[:2]
+        indices = np.flatnonzero(mask).astype(np.uint32)
+        if len(indices) == 0:
+            bbox = (0, 0, 0, 0)
+        else:
+            rows = np.flatnonzero(mask.any(axis=1))
+            cols = np.flatnonzero(mask.any(axis=0))
+            bbox = (int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1)
+
+        block_ids = block_of(indices, width)
+        order = np.argsort(block_ids, kind="stable")
+        blocks, counts = np.unique(block_ids[order], return_counts=True)
+        offsets = np.zeros(len(blocks) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(width, height, indices, bbox, blocks.astype(np.uint32), indices[order], offsets)
+
+    def select(self, selected_blocks: np.ndarray) -> np.ndarray:
+        """selected_blocks 为与 blocks 对应的布尔数组，返回这些块内的像素下标（行优先）"""
+        if selected_blocks.all():
+            return self.indices
+        selected = np.repeat(selected_blocks, np.diff(self.block_offsets))
+        return np.sort(self.block_order[selected])
+
+
+def _read(path: str, stamp: tuple[int, int]) -> MaskIndex | None:
+    try:
+        with np.load(path) as data:
+            if tuple(data["source"].tolist()) != stamp or int(data["block_size"]) != BLOCK_SIZE:
+                return None
+            height, width = data["shape"].tolist()
+            return MaskIndex(
+                width,
+                height,
+                data["indices"],
+                tuple(data["bbox"].tolist()),
+                data["blocks"],
+                data["block_order"],
+                data["block_offsets"],
+            )
+    except Exception:
+        return None
+
+
+def rebuild_mask_index(area_name: str) -> MaskIndex:
+    path = app_path().get_mask(area_name)
+    stamp = file_stamp(path)
+    index = MaskIndex.build(read_mask(path))
+
+    try:
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            source=np.array(stamp, dtype=np.int64),
+            shape=np.array((index.height, index.width), dtype=np.int64),
+            indices=index.indices,
+            bbox=np.array(index.bbox, dtype=np.int64),
+            block_size=np.array(BLOCK_SIZE, dtype=np.int64),
+            blocks=index.blocks,
+            block_order=index.block_order,
+            block_offsets=index.block_offsets,
+        )
+        atomic_write(app_path().get_mask_index(area_name), buffer.getvalue())
+    except Exception as e:
+        logger().warning(f"无法保存 `{area_name}` 的遮罩索引: {e}")
+    return index
+
+
+def load_mask_index(area_name: str) -> MaskIndex:
+    """读取遮罩索引；遮罩文件的修改时间或大小变化时自动重建"""
+    stamp = file_stamp(app_path().get_mask(area_name))
+    path = app_path().get_mask_index(area_name)
+    if os.path.exists(path):
+        index = _read(path, stamp)
+        if index is not None:
+            return index
+    return rebuild_mask_index(area_name)
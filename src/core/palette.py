@@ -0,0 +1,74 @@
+import sys
+import threading
+import numpy as np
+from src.core.utils import COLORS
+
+# 调色板下标：0..len(COLORS)-1 对应 COLORS 中的颜色，另有两个特殊值
+TRANSPARENT = 254   # 完全透明的像素 (0, 0, 0, 0)
+UNKNOWN = 255       # 其他不在调色板中的像素，比较时需要回退到完整的 RGBA
+
+PALETTE = np.array(list(COLORS.keys()), dtype=np.uint8)
+
+# 下标 -> RGBA；UNKNOWN 无法还原，占位为全 0
+PALETTE_RGBA = np.zeros((256, 4), dtype=np.uint8)
+PALETTE_RGBA[:len(PALETTE)] = PALETTE
+
+_NAMES = np.full(256, '未知颜色', dtype=object)
+_NAMES[:len(PALETTE)] = list(COLORS.values())
+_NAMES[TRANSPARENT] = '透明'
+
+_lut = None
+_lut_lock = threading.Lock()
+
+
+def _words(rgba: np.ndarray) -> np.ndarray:
+    """把 (..., 4) 的 uint8 RGBA 数组零拷贝地看作 (...) 的 uint32 数组"""
+    rgba = np.ascontiguousarray(rgba, dtype=np.uint8)
+    return rgba.view(np.uint32).reshape(rgba.shape[:-1])
+
+
+def _rgb_key(words: np.ndarray) -> np.ndarray:
+    # 取出 RGB 三个字节组成的 24 位整数，与字节序无关
+    if sys.byteorder == 'little':
+        return words & 0x00FFFFFF
+    return words >> 8
+
+
+_OPAQUE = int(_words(np.array([0, 0, 0, 255], dtype=np.uint8))[()])
+
+
+def _rgb_lut() -> np.ndarray:
+    """24 位 RGB -> 调色板下标的查找表（16 MB），首次使用时生成"""
+    global _lut
+    with _lut_lock:
+        if _lut is None:
+            lut = np.full(1 << 24, UNKNOWN, dtype=np.uint8)
+            lut[_rgb_key(_words(PALETTE))] = np.arange(len(PALETTE), dtype=np.uint8)
+            _lut = lut
+    return _lut
+
+
+def encode(rgba: np.ndarray) -> np.ndarray:
+    """把 (..., 4) 的 RGBA 数组转换为 (...) 的调色板下标数组"""
+    words = _words(rgba)
+    indices = _rgb_lut()[_rgb_key(words)]
+    indices[(words & _OPAQUE) != _OPAQUE] = UNKNOWN
+    indices[words == 0] = TRANSPARENT
+    return indices
+
+
+def decode(indices: np.ndarray) -> np.ndarray:
+    """把调色板下标还原为 RGBA，只对 is_lossless() 为真的数组是无损的"""
+    return PALETTE_RGBA[indices]
+
+
+def is_lossless(indices: np.ndarray) -> bool:
+    return not (indices == UNKNOWN).any()
+
+
+def color_names(pixels: np.ndarray) -> list[str]:
+    """name_of_color 的向量化版本，pixels 的形状为 (N, 4)"""
+    pixels = np.asarray(pixels, dtype=np.uint8).reshape(-1, 4)
+    names = _NAMES[encode(pixels)]
+    names[pixels[:, 3] == 0] = '透明'
+    return names.tolist()
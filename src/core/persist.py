@@ -0,0 +1,59 @@
+import os
+import threading
+from typing import Callable
+from src.core.logging import logger
+
+
+def atomic_write(path: str, data: bytes):
+    """先写入同目录下的临时文件并刷到磁盘，再替换原文件，写到一半崩溃也不会损坏原文件"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class WriteBehind:
+    """
+    延迟写入：第一次 schedule() 后等待 delay_ms() 毫秒再调用 write，
+    期间的多次修改合并为一次写入。退出前需要调用 flush()。
+    """
+    def __init__(self, name: str, write: Callable[[], None], delay_ms: Callable[[], int]):
+        self._name = name
+        self._write = write
+        self._delay_ms = delay_ms
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+        self._dirty = False
+
+    def schedule(self):
+        with self._lock:
+            self._dirty = True
+            if self._timer is not None:
+                return
+            delay_ms = self._delay_ms()
+            if delay_ms > 0:
+                self._timer = threading.Timer(delay_ms / 1000, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+                return
+        self.flush()
+
+    def flush(self):
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+
+            try:
+                self._write()
+            except Exception as e:
+                logger().error(f"无法保存{self._name}: {e}")
+                with self._lock:
+                    self._dirty = True
@@ -0,0 +1,212 @@
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import weakref
+import numpy as np
+from src.core.fs import app_path, file_stamp
+from src.core.settings import settings
+
+# 文件头：标识、版本、宽、高，占满一页；之后是大小相同的槽位。
+# 每个槽位开头是索引（是否使用、写入时间、名字），之后是 (H, W, 4) 的 RGBA 像素。
+# 按 64KB 对齐，各平台上都可以按槽位刷新到磁盘
+_MAGIC = b"WPRS"
+_VERSION = 1
+_PAGE = 65536
+_FILE_HEADER = struct.Struct("<4sB3xII")
+_SLOT_HEADER = struct.Struct("<B1xHQ")
+_SLOT_HEADER_SIZE = 256
+_MAX_NAME_BYTES = _SLOT_HEADER_SIZE - _SLOT_HEADER.size
+
+
+def _align(n: int) -> int:
+    return (n + _PAGE - 1) // _PAGE * _PAGE
+
+
+class ReferenceStore:
+    """
+    把所有区域的参考图保存在一个文件中，用 mmap 打开。
+    读取参考图直接返回映射内存上的只读数组，不需要打开文件或解码 PNG。
+    更新参考图时写入一个空闲槽位再切换索引，不会改写已经返回的数组；
+    旧槽位要等到引用它的数组都被释放后才会再次使用。
+    """
+    def __init__(self, path: str, width: int = 1000, height: int = 1000):
+        self._path = path
+        self._lock = threading.Lock()
+        exists = os.path.exists(path)
+        self._file = open(path, "r+b" if exists else "w+b")
+        if exists:
+            magic, version, width, height = _FILE_HEADER.unpack(self._file.read(_FILE_HEADER.size))
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError(f"不是有效的参考图文件: {path}")
+        else:
+            self._file.write(_FILE_HEADER.pack(_MAGIC, _VERSION, width, height).ljust(_PAGE, b"\0"))
+            self._file.flush()
+
+        self.width = width
+        self.height = height
+        self._pixels = width * height * 4
+        self._slot_size = _align(_SLOT_HEADER_SIZE + self._pixels)
+        self._capacity = (os.fstat(self._file.fileno()).st_size - _PAGE) // self._slot_size
+        self._map = mmap.mmap(self._file.fileno(), _PAGE + self._capacity * self._slot_size)
+
+        self._slots: dict[str, int] = {}
+        self._stamps: dict[str, int] = {}
+        self._free: list[int] = []
+        # 已经不再使用、但可能还有数组引用的槽位
+        self._retired: list[int] = []
+        self._views: dict[int, list[weakref.ref]] = {}
+        for slot in range(self._capacity):
+            used, name_len, stamp = _SLOT_HEADER.unpack_from(self._map, self._offset(slot))
+            if not used:
+                self._free.append(slot)
+                continue
+            start = self._offset(slot) + _SLOT_HEADER.size
+            name = self._map[start:start + name_len].decode("utf-8")
+            if name in self._slots:
+                # 更新时在切换索引前中断，保留较新的一份
+                stale = slot
+                if stamp > self._stamps[name]:
+                    stale, self._slots[name], self._stamps[name] = self._slots[name], slot, stamp
+                self._write_header(stale, None)
+                self._free.append(stale)
+                continue
+            self._slots[name] = slot
+            self._stamps[name] = stamp
+        self._free.sort(reverse=True)
+
+    def _offset(self, slot: int) -> int:
+        return _PAGE + slot * self._slot_size
+
+    def _view(self, slot: int) -> np.ndarray:
+        offset = self._offset(slot) + _SLOT_HEADER_SIZE
+        view = np.frombuffer(self._map, dtype=np.uint8, count=self._pixels, offset=offset)
+        return view.reshape(self.height, self.width, 4)
+
+    def _write_header(self, slot: int, name: str | None, stamp: int = 0):
+        encoded = name.encode("utf-8") if name is not None else b""
+        header = _SLOT_HEADER.pack(name is not None, len(encoded), stamp) + encoded
+        offset = self._offset(slot)
+        self._map[offset:offset + len(header)] = header
+        self._map.flush(offset, _SLOT_HEADER_SIZE)
+
+    def _grow(self):
+        # 已经返回的数组仍然引用旧的映射，所以不能 resize，只能重新映射
+        capacity = max(self._capacity * 3 // 2, self._capacity + 8)
+        size = _PAGE + capacity * self._slot_size
+        if sys.platform != "win32":
+            os.ftruncate(self._file.fileno(), size)
+        # Windows 上映射比文件大的长度时会自动扩展文件
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._free.extend(reversed(range(self._capacity, capacity)))
+        self._capacity = capacity
+
+    def _allocate(self) -> int:
+        if not self._free:
+            # 引用旧槽位的数组都已释放时才可以覆盖
+            for slot in list(self._retired):
+                if not self._referenced(slot):
+                    self._views.pop(slot, None)
+                    self._retired.remove(slot)
+                    self._free.append(slot)
+        if not self._free:
+            self._grow()
+        return self._free.pop()
+
+    def _referenced(self, slot: int) -> bool:
+        refs = [ref for ref in self._views.get(slot, []) if ref() is not None]
+        self._views[slot] = refs
+        return len(refs) > 0
+
+    def _retire(self, slot: int):
+        self._write_header(slot, None)
+        self._retired.append(slot)
+
+    def get(self, name: str) -> np.ndarray:
+        """(H, W, 4) 的只读 RGBA 参考图，与文件共享内存"""
+        with self._lock:
+            slot = self._slots.get(name)
+            if slot is None:
+                raise FileNotFoundError(f"没有 `{name}` 的参考图")
+            view = self._view(slot)
+            view.setflags(write=False)
+            self._referenced(slot)
+            # 切片等派生的数组都引用 np.frombuffer 创建的数组（view.base），而不是返回的数组
+            self._views[slot].append(weakref.ref(view.base))
+        return view
+
+    def names(self) -> list[str]:
+        with self._lock:
+            return list(self._slots)
+
+    def close(self):
+        """关闭文件；之前返回的数组必须都已释放"""
+        self._map.close()
+        self._file.close()
+
+    def stamp(self, name: str) -> int | None:
+        """参考图最后一次写入的时间（纳秒），没有参考图时为 None"""
+        with self._lock:
+            return self._stamps.get(name)
+
+    def put(self, name: str, rgba: np.ndarray):
+        if rgba.shape != (self.height, self.width, 4):
+            raise ValueError(f"参考图尺寸应为 {self.width}x{self.height}，实际为 {rgba.shape[1]}x{rgba.shape[0]}")
+        if len(name.encode("utf-8")) > _MAX_NAME_BYTES:
+            raise ValueError(f"区域名称过长: {name}")
+
+        with self._lock:
+            slot = self._allocate()
+            self._view(slot)[...] = rgba
+            self._map.flush(self._offset(slot), self._slot_size)
+            # 先写像素再写索引，写到一半中断时不会留下指向不完整数据的索引
+            stamp = time.time_ns()
+            self._write_header(slot, name, stamp)
+            old = self._slots.get(name)
+            self._slots[name] = slot
+            self._stamps[name] = stamp
+            if old is not None:
+                self._retire(old)
+
+    def remove(self, name: str):
+        with self._lock:
+            slot = self._slots.pop(name, None)
+            self._stamps.pop(name, None)
+            if slot is not None:
+                self._retire(slot)
+
+    def rename(self, old_name: str, new_name: str):
+        if len(new_name.encode("utf-8")) > _MAX_NAME_BYTES:
+            raise ValueError(f"区域名称过长: {new_name}")
+        with self._lock:
+            slot = self._slots.pop(old_name, None)
+            if slot is None:
+                return
+            stamp = self._stamps.pop(old_name)
+            self._write_header(slot, new_name, stamp)
+            self._slots[new_name] = slot
+            self._stamps[new_name] = stamp
+
+
+_reference_store: ReferenceStore | None = None
+_reference_store_lock = threading.Lock()
+
+def reference_store() -> ReferenceStore | None:
+    """application.reference_store 为 mmap 时返回参考图文件，否则为 None（每个区域一个 PNG）"""
+    global _reference_store
+    if settings().application.reference_store != "mmap":
+        return None
+    with _reference_store_lock:
+        if _reference_store is None:
+            _reference_store = ReferenceStore(app_path().get("data/originals.store"))
+        return _reference_store
+
+
+def original_stamp(area_name: str) -> int | tuple[int, int] | None:
+    """参考图写入参考图文件的时间，或者 PNG 文件的修改时间和大小；没有参考图时为 None"""
+    store = reference_store()
+    if store is not None:
+        return store.stamp(area_name)
+    return file_stamp(app_path().get_original_image(area_name))
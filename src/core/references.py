@@ -0,0 +1,89 @@
+import numpy as np
+from PIL import Image
+from src.core.fs import app_path, file_stamp
+from src.core.lru import SizedLRU
+from src.core.settings import settings
+from src.core.mask_index import MaskIndex, load_mask_index
+from src.core.mask_file import read_mask
+from src.core import palette
+from src.core.blocks import BlockDigests
+from src.core.reference_store import reference_store, original_stamp
+
+
+def _nbytes(entry: tuple) -> int:
+    value = entry[1]
+    if isinstance(value, MaskIndex):
+        return value.indices.nbytes + value.block_order.nbytes + value.blocks.nbytes + value.block_offsets.nbytes
+    return value.nbytes
+
+
+class ReferenceCache:
+    """
+    进程内共享的参考图、遮罩缓存，保存解码后的只读数组。
+    文件的修改时间或大小变化时自动失效，AreaManager 修改文件时也会主动清除；
+    总大小超过 cache.reference_memory_mb 时淘汰最久未使用的条目。
+    """
+    def __init__(self):
+        self._entries = SizedLRU(lambda: settings().cache.reference_memory_mb * 1024 * 1024, _nbytes)
+
+    def _get(self, kind: str, area_name: str, stamp, loader):
+        key = (kind, area_name)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+
+        value = loader()
+        self._entries.put(key, (stamp, value))
+        return value
+
+    def _load_original(self, area_name: str) -> np.ndarray:
+        store = reference_store()
+        if store is not None:
+            return store.get(area_name)
+        return _read_only(Image.open(app_path().get_original_image(area_name)).convert("RGBA"))
+
+    def original(self, area_name: str) -> np.ndarray:
+        """(H, W, 4) 的 RGBA 参考图"""
+        if reference_store() is not None:
+            # 直接引用参考图文件的内存，不占用缓存
+            return self._load_original(area_name)
+        stamp = original_stamp(area_name)
+        return self._get("original", area_name, stamp, lambda: self._load_original(area_name))
+
+    def original_indices(self, area_name: str) -> np.ndarray:
+        """(H, W) 的参考图调色板下标"""
+        stamp = original_stamp(area_name)
+        # 只缓存下标，解码出的 RGBA 用完即丢弃
+        return self._get("original_indices", area_name, stamp, lambda: _frozen(palette.encode(self._load_original(area_name))))
+
+    def original_blocks(self, area_name: str) -> BlockDigests:
+        """参考图的分块摘要"""
+        stamp = original_stamp(area_name)
+        return self._get("original_blocks", area_name, stamp, lambda: BlockDigests.of(self.original_indices(area_name)))
+
+    def mask(self, area_name: str) -> np.ndarray:
+        """(H, W) 的遮罩，遮罩内为 255，其余为 0"""
+        path = app_path().get_mask(area_name)
+        return self._get("mask", area_name, file_stamp(path), lambda: _frozen(read_mask(path)))
+
+    def mask_index(self, area_name: str) -> MaskIndex:
+        path = app_path().get_mask(area_name)
+        return self._get("mask_index", area_name, file_stamp(path), lambda: load_mask_index(area_name))
+
+    def invalidate(self, area_name: str):
+        self._entries.discard(lambda key: key[1] == area_name)
+
+
+def _read_only(image: Image.Image) -> np.ndarray:
+    return _frozen(np.array(image))
+
+
+def _frozen(arr: np.ndarray) -> np.ndarray:
+    arr.setflags(write=False)
+    return arr
+
+
+_reference_cache = ReferenceCache()
+
+def reference_cache() -> ReferenceCache:
+    return _reference_cache
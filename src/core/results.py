@@ -0,0 +1,156 @@
+import io
+import itertools
+import os
+import numpy as np
+from PIL import Image
+from src.core.fs import app_path, file_stamp
+from src.core.lru import SizedLRU
+from src.core.persist import atomic_write
+from src.core.logging import logger
+from src.core.settings import settings
+from src.core.diffset import DiffSet
+from src.core.tiles import Tile
+from src.core.reference_store import original_stamp
+
+
+class ResultImages:
+    """
+    检查结果中按需生成的图片，总大小受 cache.result_memory_mb 限制，淘汰最久未使用的图片。
+    被淘汰的图片在下次访问时重新生成，结果本身只保存差异数据和压缩后的区块。
+    """
+    def __init__(self):
+        self._images = SizedLRU(lambda: settings().cache.result_memory_mb * 1024 * 1024, self._nbytes)
+
+    @staticmethod
+    def _nbytes(image: Image.Image) -> int:
+        return image.width * image.height * len(image.getbands())
+
+    def get(self, key: tuple[int, str], factory) -> Image.Image:
+        image = self._images.get(key)
+        if image is None:
+            image = factory()
+            self._images.put(key, image)
+        return image
+
+    def discard(self, token: int):
+        self._images.discard(lambda key: key[0] == token)
+
+
+_result_images = ResultImages()
+_tokens = itertools.count()
+
+
+class CheckResult(dict):
+    """
+    单个区域的检查结果，本身只保存差异等紧凑的数据。
+    lazy 中的图片在访问时才生成并放入 ResultImages，不打开详情就不需要解码区块或绘制结果图。
+    """
+    def __init__(self, values: dict, lazy: dict | None = None, token: int | None = None):
+        super().__init__(values)
+        self._lazy = dict(lazy or {})
+        self._token = next(_tokens) if token is None else token
+
+    def __missing__(self, key):
+        factory = self._lazy.get(key)
+        if factory is None:
+            raise KeyError(key)
+        return _result_images.get((self._token, key), factory)
+
+    def replace(self, **values) -> 'CheckResult':
+        """复制一份结果并修改部分条目，图片与原结果共用"""
+        result = CheckResult(self, self._lazy, self._token)
+        result.update(values)
+        return result
+
+
+class ResultMemo:
+    """
+    记录每个区域上一次的检查结果。当区块内容没有变化（内容摘要相同）
+    且参考图、遮罩也没有被修改时，直接复用上一次的结果，无需重新计算差异。
+    差异同时保存到磁盘，程序重启后也能复用；
+    内存中还保存上一次检查时区块的快照，区块有变化时只需计算与上次相比变化的像素。
+    """
+    def __init__(self):
+        self._entries: dict[str, tuple[tuple, CheckResult, Tile]] = {}
+
+    @staticmethod
+    def key_of(tile: Tile, area: dict) -> tuple:
+        return (
+            tile.x,
+            tile.y,
+            tile.digest,
+            original_stamp(area["name"]),
+            file_stamp(app_path().get_mask(area["name"])),
+        )
+
+    def get(self, tile: Tile, area: dict) -> CheckResult | None:
+        entry = self._entries.get(area["name"])
+        if entry is None or entry[0] != self.key_of(tile, area):
+            return None
+        return entry[1]
+
+    def previous(self, tile: Tile, area: dict) -> tuple[Tile, DiffSet] | None:
+        """参考图和遮罩都没有变化时，返回上一次检查的区块快照和差异"""
+        entry = self._entries.get(area["name"])
+        if entry is None:
+            return None
+        key = self.key_of(tile, area)
+        if entry[0][:2] != key[:2] or entry[0][3:] != key[3:]:
+            return None
+        return entry[2], entry[1]["diffs"]
+
+    def put(self, tile: Tile, area: dict, result: CheckResult):
+        old = self._entries.get(area["name"])
+        if old is not None and old[1]._token != result._token:
+            _result_images.discard(old[1]._token)
+        self._entries[area["name"]] = (self.key_of(tile, area), result, tile.snapshot)
+
+    def load(self, tile: Tile, area: dict) -> DiffSet | None:
+        """读取上次运行时保存的差异，区块内容、参考图或遮罩有变化时返回 None"""
+        path = app_path().get_result_cache(area["name"])
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                if str(data["key"]) != _format_key(self.key_of(tile, area)):
+                    return None
+                return DiffSet(data["xs"], data["ys"], data["original"], data["current"])
+        except Exception as e:
+            logger().warning(f'无法读取 `{area["name"]}` 保存的检查结果: {e}')
+            return None
+
+    def save(self, tile: Tile, area: dict, diffs: DiffSet):
+        path = app_path().get_result_cache(area["name"])
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            buffer = io.BytesIO()
+            np.savez(
+                buffer,
+                key=np.array(_format_key(self.key_of(tile, area))),
+                xs=diffs.xs,
+                ys=diffs.ys,
+                original=diffs.original,
+                current=diffs.current,
+            )
+            atomic_write(path, buffer.getvalue())
+        except Exception as e:
+            logger().warning(f'无法保存 `{area["name"]}` 的检查结果: {e}')
+
+    def forget(self, area_name: str):
+        entry = self._entries.pop(area_name, None)
+        if entry is not None:
+            _result_images.discard(entry[1]._token)
+        try:
+            os.remove(app_path().get_result_cache(area_name))
+        except OSError:
+            pass
+
+
+def _format_key(key: tuple) -> str:
+    return "|".join(map(str, key))
+
+
+_result_memo = ResultMemo()
+
+def result_memo() -> ResultMemo:
+    return _result_memo
@@ -9,6 +9,14 @@ from dataclasses import dataclass, asdict, field
 @dataclass
 class ApplicationSettings:
     auto_check_for_updates: bool = True
+    save_debounce_ms: int = 2000
+    # "toml" 或 "sqlite"，改为 sqlite 后下次启动时会把 areas.toml 迁移到 areas.db
+    area_store: str = "toml"
+    # SQLite 存储中检查记录保留的天数，0 表示全部保留
+    check_history_days: int = 30
+    # "png" 或 "mmap"，改为 mmap 后下次启动时把 PNG 参考图导入 originals.store（PNG 文件保留），
+    # 改回 png 后下次启动时写回 PNG 文件
+    reference_store: str = "png"
 
 
 @dataclass
@@ -17,6 +25,35 @@ class CheckerSettings:
     wait_req_ms: int = 5000
     at_startup: bool = True
     auto: bool = True
+    tile_base_url: str = "https://backend.wplace.live/files/s0/tiles"
+    max_connections: int = 10
+    max_keepalive_connections: int = 5
+    keepalive_expiry_ms: int = 60000
+    timeout_ms: int = 30000
+    connect_timeout_ms: int = 10000
+    http2: bool = False
+    concurrent: bool = False
+    max_in_flight: int = 4
+    rate_limit_rps: float = 0.5
+    rate_limit_burst: int = 2
+    retry_attempts: int = 3
+    retry_base_ms: int = 2000
+    retry_max_ms: int = 60000
+    breaker_threshold: int = 5
+    breaker_cooldown_ms: int = 30000
+    breaker_max_cooldown_ms: int = 600000
+    breaker_max_wait_ms: int = 120000
+    cpu_workers: int = 0
+    diff_processes: int = 0
+
+@dataclass
+class CacheSettings:
+    tile_fresh_ms: int = 30000
+    memory_mb: int = 256
+    disk_mb: int = 512
+    disk_ttl_hours: int = 168
+    reference_memory_mb: int = 512
+    result_memory_mb: int = 256
 
 @dataclass
 class NotificationSettings:
@@ -28,6 +65,7 @@ class Settings:
     application: ApplicationSettings = field(default_factory=ApplicationSettings)
     checker: CheckerSettings = field(default_factory=CheckerSettings)
     notification: NotificationSettings = field(default_factory=NotificationSettings)
+    cache: CacheSettings = field(default_factory=CacheSettings)
 
 
     @classmethod
@@ -0,0 +1,169 @@
+import asyncio
+import datetime
+import email.utils
+import random
+import time
+import httpx
+from src.core.logging import logger
+
+
+class TokenBucket:
+    """
+    令牌桶限流器：以 rate 个/秒的速度补充令牌，最多积攒 burst 个。
+    每次网络请求前调用 acquire() 取走一个令牌，没有令牌时等待。
+    """
+    def __init__(self, rate: float, burst: int):
+        self._rate = max(rate, 1e-6)
+        self._capacity = max(burst, 1)
+        self._tokens = float(self._capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """解析 Retry-After 头，支持秒数和 HTTP 日期两种格式"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        target = email.utils.parsedate_to_datetime(value)
+        return max((target - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_hint(e: Exception) -> tuple[bool, float | None]:
+    """
+    判断一次失败的请求是否值得重试，返回 (是否重试, 服务器要求的等待秒数)。
+    网络错误、429 和 5xx 会重试，其余（如 404）直接放弃。
+    """
+    if isinstance(e, httpx.HTTPStatusError):
+        status = e.response.status_code
+        if status == 429 or status >= 500:
+            return True, parse_retry_after(e.response.headers.get("retry-after"))
+        return False, None
+    if isinstance(e, httpx.TransportError):
+        return True, None
+    return False, None
+
+
+class RetryPolicy:
+    def __init__(self, attempts: int, base_s: float, max_s: float):
+        self.attempts = attempts
+        self._base = base_s
+        self._max = max_s
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """第 attempt 次重试前的等待时间，优先遵循服务器给出的 Retry-After"""
+        if retry_after is not None:
+            return min(retry_after, self._max)
+        # full jitter：在 [0, base * 2^attempt] 内随机，避免多个请求同时重试
+        return random.uniform(0, min(self._max, self._base * 2 ** attempt))
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    连续失败达到阈值后熔断：暂停所有网络请求，冷却结束后放行一个探测请求（半开），
+    探测成功则恢复，失败则重新熔断并延长冷却时间。
+    需要等待的时间超过 max_wait_s 时直接抛出 CircuitOpenError，避免一次检查被无限拖长。
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold: int, cooldown_s: float, max_cooldown_s: float, max_wait_s: float):
+        self._threshold = max(threshold, 1)
+        self._base_cooldown = cooldown_s
+        self._max_cooldown = max_cooldown_s
+        self._max_wait = max_wait_s
+
+        self._state = self.CLOSED
+        self._failures = 0
+        self._cooldown = cooldown_s
+        self._opened_at = 0.0
+        self._probe_done = asyncio.Event()
+        self._probe = 0
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    async def acquire(self) -> int | None:
+        """作为半开状态下的探测请求时返回探测编号，请求结束时需要调用 abandon"""
+        while True:
+            if self._state == self.CLOSED:
+                return None
+
+            if self._state == self.HALF_OPEN:
+                # 等待正在进行的探测请求出结果
+                await self._probe_done.wait()
+                continue
+
+            remaining = self._opened_at + self._cooldown - time.monotonic()
+            if remaining > self._max_wait:
+                raise CircuitOpenError(f"请求已熔断，{remaining:.0f} 秒后恢复")
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+                continue
+
+            # 冷却结束，当前调用者作为探测请求
+            self._state = self.HALF_OPEN
+            self._probe_done = asyncio.Event()
+            self._probe += 1
+            logger().info("熔断冷却结束，正在发送探测请求...")
+            return self._probe
+
+    def record_success(self):
+        if self._state != self.CLOSED:
+            logger().info("探测请求成功，已恢复网络请求")
+        self._state = self.CLOSED
+        self._failures = 0
+        self._cooldown = self._base_cooldown
+        self._probe_done.set()
+
+    def record_failure(self):
+        if self._state == self.HALF_OPEN:
+            self._cooldown = min(self._cooldown * 2, self._max_cooldown)
+            self._open()
+            return
+
+        self._failures += 1
+        if self._state == self.CLOSED and self._failures >= self._threshold:
+            self._open()
+
+    def abandon(self, probe: int):
+        """
+        探测请求没有记录结果就结束（例如被取消）时重新熔断，
+        冷却时间视为已经结束，由下一个等待的请求重新探测；已经记录过结果时不做任何事
+        """
+        if self._state == self.HALF_OPEN and self._probe == probe:
+            self._state = self.OPEN
+            self._opened_at = time.monotonic() - self._cooldown
+            self._probe_done.set()
+
+    def _open(self):
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probe_done.set()
+        logger().warning(f"连续请求失败，暂停所有网络请求 {self._cooldown:.0f} 秒")
@@ -0,0 +1,360 @@
+import asyncio
+import hashlib
+import io
+import os
+import time
+import zlib
+import tomllib
+import tomli_w
+import httpx
+import numpy as np
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Callable
+from PIL import Image
+from src.core.fs import app_path
+from src.core.logging import logger
+from src.core.settings import settings
+from src.core.engine import run_cpu_bound
+from src.core import palette
+from src.core.blocks import BlockDigests
+from src.core.persist import atomic_write
+from src.core.lru import SizedLRU
+
+def tile_url(x: int, y: int) -> str:
+    return f"{settings().checker.tile_base_url.rstrip('/')}/{x}/{y}.png"
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def content_digest(content: bytes) -> str:
+    """区块原始 PNG 数据的摘要"""
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+@dataclass
+class Tile:
+    x: int
+    y: int
+    # 区块内容首次被下载的时间戳（毫秒），服务器返回 304 时保持不变
+    version: int
+    # 原始 PNG 数据的摘要，内容相同的区块摘要相同
+    digest: str
+    # 解码区块的函数，只在第一次访问 pixels 时调用
+    decoder: Callable[[], np.ndarray] = field(repr=False, compare=False)
+    _loading: asyncio.Future | None = field(default=None, init=False, repr=False, compare=False)
+    _packing: asyncio.Future | None = field(default=None, init=False, repr=False, compare=False)
+
+    @classmethod
+    def decoded(cls, x: int, y: int, version: int, digest: str, pixels: np.ndarray) -> 'Tile':
+        tile = cls(x, y, version, digest, lambda: pixels)
+        tile.pixels = pixels
+        return tile
+
+    @cached_property
+    def pixels(self) -> np.ndarray:
+        """
+        解码后的像素，同一区块上的所有区域共用：
+        所有像素都在调色板内时为 (H, W) 的调色板下标，否则为 (H, W, 4) 的 RGBA 数组
+        """
+        return self.decoder()
+
+    async def load(self) -> np.ndarray:
+        """在线程池中解码，同一区块只解码一次"""
+        if "pixels" in self.__dict__:
+            return self.pixels
+        if self._loading is None:
+            self._loading = asyncio.ensure_future(run_cpu_bound(lambda: self.pixels))
+        return await self._loading
+
+    @cached_property
+    def array(self) -> np.ndarray:
+        """(H, W, 4) 的 RGBA 数组"""
+        if self.pixels.ndim == 2:
+            return palette.decode(self.pixels)
+        return self.pixels
+
+    @cached_property
+    def indices(self) -> np.ndarray:
+        """(H, W) 的调色板下标，可能含有 palette.UNKNOWN"""
+        if self.pixels.ndim == 2:
+            return self.pixels
+        return palette.encode(self.pixels)
+
+    @cached_property
+    def blocks(self) -> BlockDigests:
+        return BlockDigests.of(self.indices)
+
+    @cached_property
+    def snapshot(self) -> 'Tile':
+        """
+        用于在两次检查之间保存的紧凑副本：已经解码的像素用 zlib 压缩保存，并保留分块摘要；
+        还没有解码时只保留原始数据。同一区块上的所有区域共用一个副本。
+        """
+        if "pixels" not in self.__dict__:
+            return Tile(self.x, self.y, self.version, self.digest, self.decoder)
+        tile = Tile(self.x, self.y, self.version, self.digest, _packed(self.pixels))
+        tile.blocks = self.blocks
+        return tile
+
+    async def pack(self) -> 'Tile':
+        """在线程池中生成 snapshot（压缩和计算分块摘要），同一区块只生成一次"""
+        if "snapshot" in self.__dict__:
+            return self.snapshot
+        if self._packing is None:
+            self._packing = asyncio.ensure_future(run_cpu_bound(lambda: self.snapshot))
+        return await self._packing
+
+    def rgba(self) -> np.ndarray:
+        """与 array 相同，但不缓存解码结果，用于按需重新生成图片"""
+        pixels = self.__dict__["pixels"] if "pixels" in self.__dict__ else self.decoder()
+        return palette.decode(pixels) if pixels.ndim == 2 else pixels
+
+    @cached_property
+    def image(self) -> Image.Image:
+        return Image.fromarray(self.array)
+
+
+def _packed(pixels: np.ndarray) -> Callable[[], np.ndarray]:
+    shape, dtype = pixels.shape, pixels.dtype
+    data = zlib.compress(np.ascontiguousarray(pixels).tobytes(), 1)
+    return lambda: np.frombuffer(zlib.decompress(data), dtype=dtype).reshape(shape)
+
+
+def _compact(array: np.ndarray) -> np.ndarray:
+    # 能无损转换为调色板下标时只保存下标，内存占用为 RGBA 的 1/4
+    indices = palette.encode(array)
+    return indices if palette.is_lossless(indices) else array
+
+
+def _decode_png(content: bytes) -> np.ndarray:
+    return _compact(np.asarray(Image.open(io.BytesIO(content)).convert("RGBA")))
+
+
+def _set_validators(entry: dict, response: httpx.Response):
+    # 304 可以省略没有变化的字段；200 中没有的字段说明服务器不再提供
+    for key, header in (("etag", "etag"), ("last_modified", "last-modified")):
+        if header in response.headers:
+            entry[key] = response.headers[header]
+        elif response.status_code != 304:
+            entry.pop(key, None)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class StaleTileCache(Exception):
+    """服务器返回 304，但本地已经没有对应的区块缓存；缓存记录已被清除，应当重新请求"""
+
+
+class TileCache:
+    """
+    两级区块缓存：
+    - 内存：保存解码后的像素（尽量使用调色板下标），总大小受 cache.memory_mb 限制；
+    - 磁盘：按区块和获取时间保存原始 PNG 数据、内容摘要以及 ETag / Last-Modified，
+      超过有效期或总大小超出限制时淘汰最久未验证的区块。
+    返回的区块只在需要时才解码。
+    """
+    def __init__(self):
+        self._entries: dict[str, dict] | None = None
+        # (x, y) -> (获取时间, 解码后的像素)
+        self._memory = SizedLRU(lambda: settings().cache.memory_mb * 1024 * 1024, lambda entry: entry[1].nbytes)
+
+    @staticmethod
+    def _key(x: int, y: int) -> str:
+        return f"{x}_{y}"
+
+    def _index(self) -> dict[str, dict]:
+        if self._entries is None:
+            self._entries = {}
+            path = app_path().get("data/cache/tiles.toml")
+            if os.path.exists(path):
+                try:
+                    with open(path, "rb") as f:
+                        self._entries = tomllib.load(f).get("tiles", {})
+                except Exception as e:
+                    logger().warning(f"无法加载区块缓存信息: {e}")
+        return self._entries
+
+    def _tile(self, x: int, y: int, version: int, digest: str, content: bytes) -> Tile:
+        def _decode() -> np.ndarray:
+            pixels = _decode_png(content)
+            self._memory.put((x, y), (version, pixels))
+            return pixels
+        return Tile(x, y, version, digest, _decode)
+
+    async def get(self, x: int, y: int) -> Tile | None:
+        entry = self._index().get(self._key(x, y))
+        if entry is None:
+            return None
+
+        version = entry["fetched_at"]
+        cached = self._memory.get((x, y))
+        if cached is not None and cached[0] == version and "digest" in entry:
+            return Tile.decoded(x, y, version, entry["digest"], cached[1])
+
+        path = app_path().get_tile_cache(x, y, version)
+        try:
+            content = await run_cpu_bound(_read_file, path)
+        except Exception as e:
+            logger().warning(f"无法读取区块缓存 ({x}, {y}): {e}")
+            return None
+
+        digest = content_digest(content)
+        if entry.setdefault("digest", digest) != digest:
+            logger().warning(f"区块缓存 ({x}, {y}) 已损坏")
+            return None
+        return self._tile(x, y, version, digest, content)
+
+    def digest(self, x: int, y: int) -> str | None:
+        entry = self._index().get(self._key(x, y))
+        return None if entry is None else entry.get("digest")
+
+    async def fresh(self, x: int, y: int) -> Tile | None:
+        """如果区块在很短的时间内已经获取过，直接返回缓存"""
+        entry = self._index().get(self._key(x, y))
+        if entry is None or _now_ms() - entry["validated_at"] > settings().cache.tile_fresh_ms:
+            return None
+        return await self.get(x, y)
+
+    def conditional_headers(self, x: int, y: int) -> dict[str, str]:
+        entry = self._index().get(self._key(x, y))
+        if entry is None or not os.path.exists(app_path().get_tile_cache(x, y, entry["fetched_at"])):
+            return {}
+
+        headers = {}
+        if "etag" in entry:
+            headers["If-None-Match"] = entry["etag"]
+        if "last_modified" in entry:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def touch(self, x: int, y: int, response: httpx.Response):
+        """服务器确认区块未变化（304），或者返回的内容与缓存完全相同；同时更新 ETag / Last-Modified"""
+        entry = self._index().get(self._key(x, y))
+        if entry is not None:
+            entry["validated_at"] = _now_ms()
+            _set_validators(entry, response)
+
+    def put(self, x: int, y: int, response: httpx.Response, digest: str) -> Tile:
+        now = _now_ms()
+        entries = self._index()
+        old = entries.pop(self._key(x, y), None)
+        if old is not None:
+            self._remove_file(x, y, old)
+
+        entry = {"fetched_at": now, "validated_at": now, "size": len(response.content), "digest": digest}
+        _set_validators(entry, response)
+
+        try:
+            path = app_path().get_tile_cache(x, y, now)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(response.content)
+            entries[self._key(x, y)] = entry
+        except Exception as e:
+            logger().warning(f"无法写入区块缓存 ({x}, {y}): {e}")
+
+        return self._tile(x, y, now, digest, response.content)
+
+    def forget(self, x: int, y: int):
+        entry = self._index().pop(self._key(x, y), None)
+        if entry is not None:
+            self._remove_file(x, y, entry)
+        self._memory.pop((x, y))
+
+    def _remove_file(self, x: int, y: int, entry: dict):
+        try:
+            os.remove(app_path().get_tile_cache(x, y, entry["fetched_at"]))
+        except OSError:
+            pass
+
+    def _evict_disk(self):
+        entries = self._index()
+        cfg = settings().cache
+        now = _now_ms()
+
+        def _drop(key: str):
+            x, y = map(int, key.split("_"))
+            self._remove_file(x, y, entries.pop(key))
+
+        for key in [k for k, e in entries.items() if now - e["validated_at"] > cfg.disk_ttl_hours * 3600 * 1000]:
+            _drop(key)
+
+        total = sum(e["size"] for e in entries.values())
+        budget = cfg.disk_mb * 1024 * 1024
+        for key in sorted(entries, key=lambda k: entries[k]["validated_at"]):
+            if total <= budget:
+                break
+            total -= entries[key]["size"]
+            _drop(key)
+
+        # 写入后还没来得及保存索引就退出时留下的文件，不在索引中也就不会被淘汰
+        directory = app_path().get("data/cache/tiles")
+        if os.path.isdir(directory):
+            known = {
+                os.path.basename(app_path().get_tile_cache(*map(int, key.split("_")), e["fetched_at"]))
+                for key, e in entries.items()
+            }
+            for file in os.listdir(directory):
+                if file not in known:
+                    try:
+                        os.remove(os.path.join(directory, file))
+                    except OSError:
+                        pass
+
+    def save(self):
+        if self._entries is None:
+            return
+        self._evict_disk()
+        path = app_path().get("data/cache/tiles.toml")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write(path, tomli_w.dumps({"tiles": self._entries}).encode("utf-8"))
+
+
+async def fetch_tile(client: httpx.AsyncClient, x: int, y: int) -> Tile:
+    url = tile_url(x, y)
+    cache = tile_cache()
+
+    response = await client.get(url, headers=cache.conditional_headers(x, y))
+    if response.status_code == 304:
+        tile = await cache.get(x, y)
+        if tile is not None:
+            logger().info(f"区块 ({x}, {y}) 未发生变化")
+            cache.touch(x, y, response)
+            return tile
+        # 不在这里直接重新请求，由调用方按正常流程（限速、熔断、统计）再请求一次
+        cache.forget(x, y)
+        raise StaleTileCache(f"区块 ({x}, {y}) 的缓存已失效")
+
+    response.raise_for_status()
+    # 即使服务器不支持条件请求，返回的内容也经常与上次完全相同，此时无需重新解码
+    digest = await run_cpu_bound(content_digest, response.content)
+    if digest == cache.digest(x, y):
+        tile = await cache.get(x, y)
+        if tile is not None:
+            logger().info(f"区块 ({x}, {y}) 内容未发生变化")
+            cache.touch(x, y, response)
+            return tile
+    return cache.put(x, y, response, digest)
+
+
+async def get_tile(client: httpx.AsyncClient, x: int, y: int) -> Tile:
+    tile = await tile_cache().fresh(x, y)
+    if tile is not None:
+        logger().info(f"区块 ({x}, {y}) 刚刚获取过，使用缓存")
+        return tile
+    try:
+        return await fetch_tile(client, x, y)
+    except StaleTileCache:
+        return await fetch_tile(client, x, y)
+
+
+_tile_cache = TileCache()
+
+def tile_cache() -> TileCache:
+    return _tile_cache
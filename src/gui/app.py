@@ -111,8 +111,13 @@ class App(QMainWindow):
             self.auto_check_action.setText('关闭自动检查')
         self.set_next_update()
 
+    def update_throughput(self):
+        stats = self.check_area_thread.stats
+        self.app_sbar.set_throughput(stats.requests, stats.throughput())
+
     def set_next_update(self):
         if self.is_checking:
+            self.update_throughput()
             self.app_sbar.set_next_update(-3)
         elif self.auto_check_enabled:
             elapsed = self.start_check_time.msecsTo(QTime.currentTime())
@@ -147,13 +152,14 @@ class App(QMainWindow):
         def _slot(results):
             self.check_timer.stop()
             self.update_list_with_new_results(results)
+            self.update_throughput()
             if self.auto_check_enabled:
                 self._start_auto_check_timer()
             self.set_checking(False)
             logger().info('所有区域已检查完毕')
             self.send_notification()
 
-        self.check_area_thread = CheckThread(area_manager().areas)
+        self.check_area_thread = CheckThread(area_manager().snapshot())
         self.check_area_thread.finished.connect(_slot)
         self.set_checking(True)
         self.check_area_thread.start()
@@ -165,7 +171,15 @@ class App(QMainWindow):
                 continue
             diffs = len(result['diffs'])
             if diffs > 0 and not area_manager().area(area_name)['ignored']:
-                messages.append(f'`{area_name}` 有 {diffs} 个异常像素')
+                message = f'`{area_name}` 有 {diffs} 个异常像素'
+                new_diffs = len(result.get('new_diffs', ()))
+                if 0 < new_diffs < diffs:
+                    message += f'（新增 {new_diffs} 个）'
+                clusters = result.get('clusters')
+                if clusters and clusters[0].count > 1:
+                    x, y = clusters[0].centroid
+                    message += f'，最大一处 {clusters[0].count} 个，位于 ({x:.0f}, {y:.0f}) 附近'
+                messages.append(message)
 
         if len(messages) > 0:
             show_notification('检查出异常像素', '\n'.join(messages))
@@ -2,11 +2,10 @@ from PyQt6.QtWidgets import *
 from PyQt6.QtGui import QAction, QPixmap
 from PyQt6.QtCore import Qt, pyqtSignal
 from PIL.ImageQt import ImageQt
-from src.core.utils import name_of_color
 
 from src.gui.qt_image_viewer import QtImageViewer
 from src.gui.area_edit_dialog import AreaEditDialog
-from src.core import area_manager, Diff
+from src.core import area_manager, DiffSet, Cluster
 from src.gui.threads import CheckThread
 
 class AreaDetailDialog(QDialog):
@@ -27,10 +26,7 @@ class AreaDetailDialog(QDialog):
         if self.result is None:
             return
 
-        base_img = self.result['current_image'].copy()
-        diff_img = self.result['diff_image']
-        base_img.paste(diff_img, (0, 0), diff_img)
-        self.diff_qimg = QPixmap.fromImage(ImageQt(base_img))
+        self.diff_qimg = QPixmap.fromImage(ImageQt(self.result['diff_view']))
         self.original_qimg = QPixmap.fromImage(ImageQt(self.result['original_image']))
         self.current_qimg = QPixmap.fromImage(ImageQt(self.result['current_image']))
 
@@ -41,18 +37,23 @@ class AreaDetailDialog(QDialog):
             self.diff_label.setText(f"待检查")
             return
         
-        msg = f"找到 {len(self.result["diffs"])} 个异常像素"
-        for i, diff in enumerate(self.result["diffs"]):
-            if i >= 100:
-                msg += "(仅显示100个)"
-                break
-            x, y, orig, curr = diff
-
+        diffs: DiffSet = self.result["diffs"]
+        clusters: list[Cluster] = self.result["clusters"]
+        msg = f"找到 {len(diffs)} 个异常像素"
+        if clusters:
+            msg += f"，最大的 {len(clusters)} 处如下"
+
+        for i, cluster in enumerate(clusters):
+            left, top, right, bottom = cluster.bbox
             item_widget = QLabel(self.list_widget)
             item_widget.setStyleSheet('QLabel { font-size: 20px }')
-            item_widget.setText(f"({x}, {y}): \n{name_of_color(orig)} -> {name_of_color(curr)}\n")
+            item_widget.setText(
+                f"#{i + 1} {cluster.count} 个像素\n"
+                f"({left}, {top}) - ({right - 1}, {bottom - 1})\n"
+                f"主要颜色: {cluster.color_name}\n"
+            )
             list_item = QListWidgetItem(self.list_widget)
-            list_item.setData(Qt.ItemDataRole.UserRole, diff)
+            list_item.setData(Qt.ItemDataRole.UserRole, cluster)
 
             list_item.setSizeHint(item_widget.sizeHint())
             self.list_widget.addItem(list_item)
@@ -123,7 +124,7 @@ class AreaDetailDialog(QDialog):
         self.setWindowTitle(f"区域详情: {self.area_name}")
 
     def check_area(self):
-        self.thread = CheckThread([area_manager().area(self.area_name)])
+        self.thread = CheckThread(area_manager().snapshot([self.area_name]))
         self.thread.finished.connect(self.on_check_thread_finished)
 
         self.check_action.setEnabled(False)
@@ -153,9 +154,9 @@ class AreaDetailDialog(QDialog):
 
 
     def on_diff_item_clicked(self, item: QListWidgetItem):
-        diff: Diff = item.data(Qt.ItemDataRole.UserRole)
-        if diff:
-            self.image_viewer.move(diff.x, diff.y)
+        cluster: Cluster = item.data(Qt.ItemDataRole.UserRole)
+        if cluster:
+            self.image_viewer.zoomTo(*cluster.bbox)
 
     def on_radio_button_clicked(self, button):
         if button == self.show_diff_radio:
@@ -1,6 +1,7 @@
 from PyQt6.QtWidgets import *
 from PyQt6.QtCore import Qt
 from src.core import area_manager
+from src.core.check import get_mask_image
 from src.gui.mask_editor import MaskEditor
 
 class AreaEditDialog(QDialog):
@@ -57,6 +58,10 @@ class AreaEditDialog(QDialog):
         self.import_mask_button.clicked.connect(self.import_mask)
         layout.addWidget(self.import_mask_button)
 
+        self.export_mask_button = QPushButton("导出遮罩")
+        self.export_mask_button.clicked.connect(self.export_mask)
+        layout.addWidget(self.export_mask_button)
+
         self.remove_area_button = QPushButton("删除区域")
         self.remove_area_button.clicked.connect(self.remove_area)
         layout.addWidget(self.remove_area_button)
@@ -79,6 +84,15 @@ class AreaEditDialog(QDialog):
         if file_path:
             self.new_mask = file_path
 
+    def export_mask(self):
+        file_dialog = QFileDialog()
+        file_path, _ = file_dialog.getSaveFileName(self, "导出遮罩图片", f"{self.area['name']}.png", "图片文件 (*.png)")
+        if file_path:
+            try:
+                get_mask_image(self.area).save(file_path)
+            except Exception as e:
+                QMessageBox.warning(self, "导出失败", f"无法保存遮罩图片: {e}")
+
     def import_original_image(self):
         file_dialog = QFileDialog()
         file_path, _ = file_dialog.getOpenFileName(self, "选择参考图", "", "图片文件 (*.png)")
@@ -1,4 +1,6 @@
 import sys
+import numpy as np
+from PIL import Image
 from PyQt6.QtWidgets import (QButtonGroup, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QPushButton, QRadioButton, 
                              QSlider, QLabel, QMessageBox, QSizePolicy, QScrollArea)
@@ -6,7 +8,8 @@ from PyQt6.QtGui import QPixmap, QImage, QPainter, QColor, QPen, QPalette
 from PyQt6.QtCore import Qt, QPoint
 
 # 假设 area_manager 和 app_path 已经存在并正确导入
-from src.core import app_path
+from src.core import area_manager
+from src.core.references import reference_cache
 
 class MaskEditor(QMainWindow):
     def __init__(self, parent, area_name: str):
@@ -201,20 +204,26 @@ class MaskEditor(QMainWindow):
         self.scroll_area.verticalScrollBar().setValue(int(new_v_scroll))
 
     def open_background_image(self):
-        file_name = app_path().get_original_image(self.area_name)
-        image = QImage(file_name)
+        original = np.ascontiguousarray(reference_cache().original(self.area_name))
+        height, width = original.shape[:2]
+        image = QImage(original.data, width, height, width * 4, QImage.Format.Format_RGBA8888)
         self.background_image = image.convertToFormat(QImage.Format.Format_ARGB32)
         self.update_canvas()
 
     def open_image(self):
-        file_name = app_path().get_mask_image(self.area_name)
-        image = QImage(file_name)   
+        mask = np.ascontiguousarray(reference_cache().mask(self.area_name))
+        height, width = mask.shape
+        image = QImage(mask.data, width, height, width, QImage.Format.Format_Grayscale8)
+        # convertToFormat 会复制数据，不再引用 mask 的内存
         self.current_image = image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
         self.update_canvas()
 
     def save_image(self):
-        file_name = app_path().get_mask_image(self.area_name)
-        self.current_image.save(file_name)
+        image = self.current_image.convertToFormat(QImage.Format.Format_Grayscale8)
+        bits = image.constBits()
+        bits.setsize(image.sizeInBytes())
+        rows = np.frombuffer(bits, dtype=np.uint8).reshape(image.height(), image.bytesPerLine())
+        area_manager().update_mask(self.area_name, Image.fromarray(rows[:, :image.width()].copy()))
         QMessageBox.information(self, "修改成功", "遮罩图片已保存。")
 
     def toggle_tool(self):
@@ -158,6 +158,12 @@ class QtImageViewer(QGraphicsView):
         self.updateViewer()
         self.viewChanged.emit()
 
+    def zoomTo(self, left: int, top: int, right: int, bottom: int, margin: int = 5):
+        target_rect = QRectF(left - margin, top - margin, right - left + 2 * margin, bottom - top + 2 * margin)
+        self.zoomStack.append(target_rect.intersected(self.sceneRect()))
+        self.updateViewer()
+        self.viewChanged.emit()
+
     def sizeHint(self):
         return QSize(900, 600)
 
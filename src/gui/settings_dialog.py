@@ -65,6 +65,39 @@ class SettingsDialog(QDialog):
         self.wait_for_next_area_spinbox.setValue(settings().checker.wait_req_ms)
         layout.addLayout(wait_layout)
 
+        self.concurrent_checkbox = QCheckBox("并发获取区块（使用下方的限速设置代替固定间隔）")
+        self.concurrent_checkbox.setChecked(settings().checker.concurrent)
+        layout.addWidget(self.concurrent_checkbox)
+
+        concurrent_layout = QHBoxLayout()
+        concurrent_label1 = QLabel("最多同时进行")
+        self.max_in_flight_spinbox = QSpinBox()
+        self.max_in_flight_spinbox.setRange(1, 32)
+        concurrent_label2 = QLabel("个网络请求")
+        concurrent_layout.addWidget(concurrent_label1)
+        concurrent_layout.addWidget(self.max_in_flight_spinbox)
+        concurrent_layout.addWidget(concurrent_label2)
+        self.max_in_flight_spinbox.setValue(settings().checker.max_in_flight)
+        layout.addLayout(concurrent_layout)
+
+        rate_layout = QHBoxLayout()
+        rate_label1 = QLabel("每秒最多")
+        self.rate_limit_spinbox = QDoubleSpinBox()
+        self.rate_limit_spinbox.setRange(0.01, 20.0)
+        self.rate_limit_spinbox.setSingleStep(0.1)
+        rate_label2 = QLabel("次请求，最多允许连续突发")
+        self.rate_burst_spinbox = QSpinBox()
+        self.rate_burst_spinbox.setRange(1, 100)
+        rate_label3 = QLabel("次")
+        rate_layout.addWidget(rate_label1)
+        rate_layout.addWidget(self.rate_limit_spinbox)
+        rate_layout.addWidget(rate_label2)
+        rate_layout.addWidget(self.rate_burst_spinbox)
+        rate_layout.addWidget(rate_label3)
+        self.rate_limit_spinbox.setValue(settings().checker.rate_limit_rps)
+        self.rate_burst_spinbox.setValue(settings().checker.rate_limit_burst)
+        layout.addLayout(rate_layout)
+
         self.check_on_boot_checkbox = QCheckBox("启动时立即检查")
         self.check_on_boot_checkbox.setChecked(settings().checker.at_startup)
         layout.addWidget(self.check_on_boot_checkbox)
@@ -139,6 +172,10 @@ class SettingsDialog(QDialog):
 
                 settings().checker.interval_ms = self.check_interval_spinbox.value()
                 settings().checker.wait_req_ms = self.wait_for_next_area_spinbox.value()
+                settings().checker.concurrent = self.concurrent_checkbox.isChecked()
+                settings().checker.max_in_flight = self.max_in_flight_spinbox.value()
+                settings().checker.rate_limit_rps = self.rate_limit_spinbox.value()
+                settings().checker.rate_limit_burst = self.rate_burst_spinbox.value()
                 settings().checker.at_startup = self.check_on_boot_checkbox.isChecked()
                 settings().checker.auto = self.auto_check_enabled_checkbox.isChecked()
 
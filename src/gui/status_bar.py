@@ -22,8 +22,10 @@ class AppStatusBar(QStatusBar):
         super().__init__(parent)
         self.setStyleSheet('QLabel { font-size: 14px }')
         self.next_update_label = QLabel("下次检查: N/A")
+        self.throughput_label = QLabel("吞吐: N/A")
         self.logging_info_label = QLabel("")
 
+        self.addPermanentWidget(self.throughput_label)
         self.addPermanentWidget(self.next_update_label)
         self.addWidget(self.logging_info_label)
 
@@ -43,5 +45,8 @@ class AppStatusBar(QStatusBar):
 
         self.next_update_label.setText(f"下次检查: {text}")
 
+    def set_throughput(self, requests: int, requests_per_sec: float):
+        self.throughput_label.setText(f"吞吐: {requests_per_sec:.2f} 次/秒 (共 {requests} 次)")
+
     def set_logging_info(self, text):
         self.logging_info_label.setText(f"{text}")
\ No newline at end of file
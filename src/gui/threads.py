@@ -1,6 +1,5 @@
 from PyQt6.QtCore import QThread, pyqtSignal
-from src.core import monitor_all, app_path, logger
-import asyncio
+from src.core import monitor_all, app_path, logger, check_engine, CheckStats
 import requests
 import os
 import zipfile
@@ -11,9 +10,10 @@ class CheckThread(QThread):
     def __init__(self, areas):
         super().__init__()
         self._areas = areas
+        self.stats = CheckStats()
 
     def run(self):
-        results = asyncio.run(monitor_all(self._areas))
+        results = check_engine().run(monitor_all(self._areas, self.stats))
         self.finished.emit(results)
 
 
@@ -3,8 +3,10 @@ from PyQt6.QtCore import QSharedMemory
 from PyQt6.QtGui import QFont, QFontDatabase, QIcon
 from src.gui import App
 from src.core.utils import parse_sys_args
-from src.core import init_settings, settings, init_logger, logger, app_path
-from src.migrations import apply_migrations, is_version_too_low
+from src.core import init_settings, settings, init_logger, logger, app_path, check_engine, area_manager, tile_cache
+from src.migrations import apply_migrations, is_version_too_low, has_pending_migrations
+from src import __version__
+import multiprocessing
 import sys
 
 
@@ -30,6 +32,8 @@ def main():
         apply_migrations(SYS_ARGS['migrate-from'])
     elif is_version_too_low():
         apply_migrations()
+    elif has_pending_migrations(__version__):
+        apply_migrations(__version__)
 
     logger().info("正在加载设置...")
     init_settings()
@@ -60,10 +64,14 @@ def main():
         window.check_areas()
     
     exit_code = app.exec()
+    check_engine().close()
+    area_manager().flush()
+    tile_cache().save()
     logger().info('正在保存设置...')
     settings().save()
     return exit_code
 
 
 if __name__ == "__main__":
+     multiprocessing.freeze_support()
      sys.exit(main())
\ No newline at end of file
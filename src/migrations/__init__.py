@@ -6,13 +6,22 @@ import os
 def is_version_too_low():
     return not os.path.exists(app_path().get('assets/.migrated')) 
 
-def apply_migrations(from_version: str='0.1.0'):
-    logger().info("正在执行版本迁移...")
-    migrators = [
+def _migrators() -> list[Migrator]:
+    return [
         Migrator_0_2_3(),
+        Migrator_AreaStore(),
+        Migrator_AreaStoreToToml(),
+        Migrator_ReferenceStore(),
+        Migrator_ReferenceStoreToPng(),
+        Migrator_MaskFiles(),
     ]
 
-    for migrator in migrators:
+def has_pending_migrations(from_version: str) -> bool:
+    return any(migrator.should_migrate(from_version) for migrator in _migrators())
+
+def apply_migrations(from_version: str='0.1.0'):
+    logger().info("正在执行版本迁移...")
+    for migrator in _migrators():
         if migrator.should_migrate(from_version):
             logger().info(f"正在执行迁移程序 {migrator}...")
             migrator.migrate()
@@ -23,4 +32,5 @@ def apply_migrations(from_version: str='0.1.0'):
 
 __all__ = [
     "apply_migrations",
+    "has_pending_migrations",
 ]
\ No newline at end of file
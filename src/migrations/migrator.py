@@ -2,7 +2,12 @@ from abc import ABC, abstractmethod
 import tomllib
 import tomli_w
 import os
+import numpy as np
 from src.core import app_path, logger
+from src.core.area_store import PendingChanges, SqliteAreaStore, TomlAreaStore
+from src.core.mask_file import write_mask
+from src.core.reference_store import ReferenceStore
+from PIL import Image
 from packaging import version
 from src import __version__
 
@@ -48,4 +53,152 @@ class Migrator_0_2_3(Migrator):
                 f.write(tomli_w.dumps(settings).encode("utf-8"))
 
         except Exception as e:
-            logger().error(f"无法更新设置文件: {e}")
\ No newline at end of file
+            logger().error(f"无法更新设置文件: {e}")
+
+
+def _application_setting(key: str, default: str) -> str | None:
+    try:
+        with open(app_path().get("data/settings.toml"), "rb") as f:
+            settings = tomllib.load(f)
+    except Exception:
+        return None
+    return settings.get('application', {}).get(key, default)
+
+
+class Migrator_AreaStore(Migrator):
+    """设置中 application.area_store 改为 sqlite 后，把 areas.toml 一次性导入 areas.db"""
+    def should_migrate(self, from_version: str) -> bool:
+        return (
+            _application_setting('area_store', 'toml') == 'sqlite'
+            and os.path.exists(app_path().get("data/areas.toml"))
+            and not os.path.exists(app_path().get("data/areas.db"))
+        )
+
+    def migrate(self):
+        tmp_path = app_path().get("data/areas.db.tmp")
+        try:
+            areas = TomlAreaStore().load()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            store = SqliteAreaStore(tmp_path)
+            store.write(areas, PendingChanges(updated={area['name'] for area in areas}))
+            # 导入完成后才出现 areas.db，中途失败下次启动会重新导入
+            os.replace(tmp_path, app_path().get("data/areas.db"))
+            os.replace(app_path().get("data/areas.toml"), app_path().get("data/areas.toml.bak"))
+            logger().info(f"已将 {len(areas)} 个区域迁移到 areas.db，原文件保存为 areas.toml.bak")
+
+        except Exception as e:
+            logger().error(f"无法迁移区域配置: {e}")
+
+
+class Migrator_AreaStoreToToml(Migrator):
+    """application.area_store 从 sqlite 改回 toml 后，把 areas.db 中的区域导出为 areas.toml"""
+    def should_migrate(self, from_version: str) -> bool:
+        return (
+            _application_setting('area_store', 'toml') == 'toml'
+            and os.path.exists(app_path().get("data/areas.db"))
+            and not os.path.exists(app_path().get("data/areas.toml"))
+        )
+
+    def migrate(self):
+        try:
+            areas = SqliteAreaStore(app_path().get("data/areas.db")).load()
+            TomlAreaStore().write(areas, PendingChanges())
+            # 检查记录只能保存在 SQLite 中，保留旧数据库以免丢失
+            os.replace(app_path().get("data/areas.db"), app_path().get("data/areas.db.bak"))
+            logger().info(f"已将 {len(areas)} 个区域导出到 areas.toml，原数据库保存为 areas.db.bak")
+
+        except Exception as e:
+            logger().error(f"无法导出区域配置: {e}")
+
+
+class Migrator_ReferenceStore(Migrator):
+    """application.reference_store 改为 mmap 后，把 PNG 参考图导入 originals.store，PNG 文件保留作为备份"""
+    def _pending(self) -> list[str]:
+        directory = app_path().get("data/originals")
+        if _application_setting('reference_store', 'png') != 'mmap' or not os.path.isdir(directory):
+            return []
+        names = [file[:-len(".png")] for file in os.listdir(directory) if file.endswith(".png")]
+        path = app_path().get("data/originals.store")
+        if names and os.path.exists(path):
+            # 已经导入过的参考图，PNG 文件只是备份
+            store = ReferenceStore(path)
+            imported = set(store.names())
+            store.close()
+            names = [name for name in names if name not in imported]
+        return names
+
+    def should_migrate(self, from_version: str) -> bool:
+        return len(self._pending()) > 0
+
+    def migrate(self):
+        names = self._pending()
+        try:
+            store = ReferenceStore(app_path().get("data/originals.store"))
+        except Exception as e:
+            logger().error(f"无法打开参考图文件: {e}")
+            return
+        for name in names:
+            try:
+                store.put(name, np.asarray(Image.open(app_path().get_original_image(name)).convert("RGBA")))
+            except Exception as e:
+                logger().error(f"无法导入 `{name}` 的参考图: {e}")
+        store.close()
+        logger().info(f"已将 {len(names)} 张参考图导入 originals.store，原文件保留")
+
+
+class Migrator_ReferenceStoreToPng(Migrator):
+    """application.reference_store 从 mmap 改回 png 后，把 originals.store 中的参考图写回 PNG 文件"""
+    def should_migrate(self, from_version: str) -> bool:
+        return (
+            _application_setting('reference_store', 'png') == 'png'
+            and os.path.exists(app_path().get("data/originals.store"))
+        )
+
+    def migrate(self):
+        try:
+            store = ReferenceStore(app_path().get("data/originals.store"))
+            names = store.names()
+            for name in names:
+                # 覆盖导入时保留的 PNG，参考图可能已经更新过
+                Image.fromarray(store.get(name)).save(app_path().get_original_image(name))
+            store.close()
+            os.replace(app_path().get("data/originals.store"), app_path().get("data/originals.store.bak"))
+            logger().info(f"已将 {len(names)} 张参考图写回 PNG 文件，原文件保存为 originals.store.bak")
+
+        except Exception as e:
+            logger().error(f"无法导出参考图: {e}")
+
+
+class Migrator_MaskFiles(Migrator):
+    """把旧版本保存的 PNG 遮罩转换为 .mask 文件，PNG 文件保留作为备份"""
+    def _pending(self) -> list[str]:
+        masks = app_path().get("data/masks")
+        if not os.path.isdir(masks):
+            return []
+        names = []
+        for file in os.listdir(masks):
+            if not file.endswith(".png"):
+                continue
+            name = file[:-len(".png")]
+            target = app_path().get_mask(name)
+            # 用旧版本修改过的遮罩比 .mask 文件新，需要重新转换
+            if (
+                not os.path.exists(target)
+                or os.stat(app_path().get_mask_image(name)).st_mtime_ns > os.stat(target).st_mtime_ns
+            ):
+                names.append(name)
+        return names
+
+    def should_migrate(self, from_version: str) -> bool:
+        return len(self._pending()) > 0
+
+    def migrate(self):
+        names = self._pending()
+        for name in names:
+            try:
+                mask = Image.open(app_path().get_mask_image(name)).convert("L")
+                write_mask(app_path().get_mask(name), np.asarray(mask))
+            except Exception as e:
+                logger().error(f"无法转换 `{name}` 的遮罩: {e}")
+        logger().info(f"已将 {len(names)} 个 PNG 遮罩转换为 .mask 文件，原文件保留")
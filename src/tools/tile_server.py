@@ -0,0 +1,209 @@
+"""
+本地区块服务器，用于在不访问 wplace.live 的情况下对检查程序进行压测和复现问题。
+
+区块从目录中读取，路径格式与 wplace 相同：`<dir>/<x>/<y>.png`。
+支持 ETag / Last-Modified 条件请求，并可以模拟网络延迟、错误和区块被修改。
+
+用法：
+    python -m src.tools.tile_server --dir <tiles> --port 8000 --latency-ms 200 --error-rate 0.05 --mutation-rate 0.1
+
+然后把 data/settings.toml 中的 `checker.tile_base_url` 设置为 `http://127.0.0.1:8000/files/s0/tiles`。
+"""
+import argparse
+import email.utils
+import io
+import os
+import random
+import re
+import threading
+import time
+import numpy as np
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from PIL import Image
+from src.core.utils import COLORS
+
+TILE_PATH = re.compile(r"^/files/s0/tiles/(\d+)/(\d+)\.png$")
+TILE_SIZE = 1000
+
+
+@dataclass
+class ServerOptions:
+    directory: str
+    latency_ms: int = 0
+    latency_jitter_ms: int = 0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    mutation_rate: float = 0.0
+    mutation_pixels: int = 50
+    blank_missing: bool = False
+
+
+@dataclass(frozen=True)
+class TileResponse:
+    """某一时刻的区块内容，ETag、修改时间与内容总是一致的"""
+    etag: str
+    last_modified: str
+    modified_at: float
+    body: bytes
+
+    def not_modified(self, if_none_match: str | None, if_modified_since: str | None) -> bool:
+        # 同时带有两个条件时只看 If-None-Match
+        if if_none_match is not None:
+            return if_none_match == self.etag
+        if if_modified_since is not None:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(self.modified_at) <= since
+        return False
+
+
+class TileState:
+    def __init__(self, array: np.ndarray):
+        self.array = array
+        self.version = 0
+        self.body = b""
+        self.modified_at = time.time()
+        self._encode()
+
+    def _encode(self):
+        buf = io.BytesIO()
+        Image.fromarray(self.array).save(buf, "PNG")
+        self.body = buf.getvalue()
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.version}"'
+
+    @property
+    def last_modified(self) -> str:
+        return email.utils.formatdate(self.modified_at, usegmt=True)
+
+    def mutate(self, pixels: int):
+        palette = list(COLORS.keys())
+        ys = np.random.randint(0, self.array.shape[0], pixels)
+        xs = np.random.randint(0, self.array.shape[1], pixels)
+        self.array[ys, xs] = palette[random.randrange(len(palette))]
+        self.version += 1
+        # Last-Modified 的精度是秒，保证每次修改都能被区分
+        self.modified_at = max(time.time(), self.modified_at + 1)
+        self._encode()
+
+    def response(self) -> TileResponse:
+        return TileResponse(self.etag, self.last_modified, self.modified_at, self.body)
+
+
+class TileRepository:
+    def __init__(self, options: ServerOptions):
+        self._options = options
+        self._tiles: dict[tuple[int, int], TileState] = {}
+        self._lock = threading.Lock()
+
+    def get(self, x: int, y: int) -> TileResponse | None:
+        with self._lock:
+            if (x, y) not in self._tiles:
+                path = os.path.join(self._options.directory, str(x), f"{y}.png")
+                if os.path.exists(path):
+                    array = np.array(Image.open(path).convert("RGBA"))
+                elif self._options.blank_missing:
+                    array = np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+                else:
+                    return None
+                self._tiles[(x, y)] = TileState(array)
+
+            tile = self._tiles[(x, y)]
+            if random.random() < self._options.mutation_rate:
+                tile.mutate(self._options.mutation_pixels)
+            return tile.response()
+
+
+def make_handler(options: ServerOptions, repository: TileRepository):
+    class TileRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            delay = options.latency_ms + random.uniform(-1, 1) * options.latency_jitter_ms
+            if delay > 0:
+                time.sleep(delay / 1000)
+
+            match = TILE_PATH.match(self.path)
+            if match is None:
+                self.send_error(404)
+                return
+
+            if random.random() < options.throttle_rate:
+                self.send_response(429)
+                self.send_header("Retry-After", "1")
+                self.end_headers()
+                return
+            if random.random() < options.error_rate:
+                self.send_error(500)
+                return
+
+            tile = repository.get(int(match.group(1)), int(match.group(2)))
+            if tile is None:
+                self.send_error(404)
+                return
+
+            if tile.not_modified(self.headers.get("If-None-Match"), self.headers.get("If-Modified-Since")):
+                self.send_response(304)
+                self.send_header("ETag", tile.etag)
+                self.send_header("Last-Modified", tile.last_modified)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(tile.body)))
+            self.send_header("ETag", tile.etag)
+            self.send_header("Last-Modified", tile.last_modified)
+            self.end_headers()
+            self.wfile.write(tile.body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return TileRequestHandler
+
+
+def create_server(options: ServerOptions, host: str = "127.0.0.1", port: int = 8000) -> ThreadingHTTPServer:
+    repository = TileRepository(options)
+    return ThreadingHTTPServer((host, port), make_handler(options, repository))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地区块服务器")
+    parser.add_argument("--dir", required=True, help="区块目录，结构为 <dir>/<x>/<y>.png")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency-ms", type=int, default=0, help="每个请求的延迟")
+    parser.add_argument("--latency-jitter-ms", type=int, default=0, help="延迟的随机浮动范围")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 500 的概率")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="返回 429 的概率")
+    parser.add_argument("--mutation-rate", type=float, default=0.0, help="每次请求时区块被随机修改的概率")
+    parser.add_argument("--mutation-pixels", type=int, default=50, help="每次修改的像素数")
+    parser.add_argument("--blank-missing", action="store_true", help="目录中不存在的区块返回空白图片而不是 404")
+    args = parser.parse_args()
+
+    options = ServerOptions(
+        directory=args.dir,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        mutation_rate=args.mutation_rate,
+        mutation_pixels=args.mutation_pixels,
+        blank_missing=args.blank_missing,
+    )
+    server = create_server(options, args.host, args.port)
+    print(f"区块服务器已启动: http://{args.host}:{args.port}/files/s0/tiles/{{x}}/{{y}}.png")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import gc
+import numpy as np
+from src.core.reference_store import ReferenceStore
+
+
+def _image(value: int) -> np.ndarray:
+    return np.full((8, 8, 4), value, dtype=np.uint8)
+
+
+def test_slice_survives_updates(tmp_path):
+    store = ReferenceStore(str(tmp_path / "originals.store"), width=8, height=8)
+    store.put("x", _image(1))
+    piece = store.get("x")[2:4]
+    gc.collect()
+
+    for value in range(2, 40):
+        store.put("x", _image(value))
+        assert (piece == 1).all()
+        assert (store.get("x") == value).all()
+
+    del piece
+    gc.collect()
+    capacity = store._capacity
+    for value in range(40, 80):
+        store.put("x", _image(value))
+    # 释放切片后旧槽位可以再次使用，文件不再增长
+    assert store._capacity == capacity
+    store.close()